@@ -0,0 +1,76 @@
+"""
+Username/email autocomplete for picking users in forms.
+
+``UserAutocompleteWidget`` replaces a ``<select>`` of every user with a text
+box that asks ``user_autocomplete`` for matches as the user types (HTMX) and
+a hidden input holding the chosen user's id. Matches are prefix searches on
+the ``Lower(username)`` and ``Lower(email)`` indexes, cached briefly per
+prefix.
+"""
+
+import hashlib
+
+from django import forms
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Q
+from django.db.models.functions import Lower
+from django.urls import reverse_lazy
+
+# Sorts after anything a prefix can be followed by, in SQLite's binary
+# collation; locale collations (e.g. PostgreSQL's default) may not agree.
+PREFIX_END = "\U0010ffff"
+
+
+def prefix_range(field, prefix):
+    """``field`` starts with ``prefix``, as a range an index can scan."""
+    if connection.vendor != "sqlite":
+        # SQLite's LIKE never uses the index; elsewhere it is the safe choice
+        return Q(**{f"{field}__startswith": prefix})
+    return Q(**{f"{field}__gte": prefix, f"{field}__lt": prefix + PREFIX_END})
+
+
+def matching_users(query, limit=10):
+    """Up to ``limit`` active users whose username or email starts with ``query``."""
+    prefix = query.strip().lower()
+    if not prefix:
+        return []
+    key = "user-autocomplete:" + hashlib.md5(prefix.encode()).hexdigest()
+    users = cache.get(key)
+    if users is None:
+        users = list(
+            get_user_model()
+            .objects.annotate(
+                username_lower=Lower("username"), email_lower=Lower("email")
+            )
+            .filter(
+                prefix_range("username_lower", prefix)
+                | prefix_range("email_lower", prefix),
+                is_active=True,
+            )
+            .order_by("username_lower")
+            .values("pk", "username", "email")[:limit]
+        )
+        cache.set(key, users, settings.USER_AUTOCOMPLETE_CACHE_TIMEOUT)
+    return users
+
+
+class UserAutocompleteWidget(forms.Widget):
+    template_name = "accounts/widgets/user_autocomplete.html"
+    url = reverse_lazy("user_autocomplete")
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        # Only the chosen user is loaded, for its name
+        label = ""
+        if value:
+            label = (
+                get_user_model()
+                .objects.filter(pk=value)
+                .values_list("username", flat=True)
+                .first()
+            ) or ""
+        context["widget"].update(label=label, url=self.url)
+        return context
@@ -0,0 +1,33 @@
+"""
+An authentication backend that keeps users in the cache.
+
+``ModelBackend.get_user`` runs on every authenticated request. This one reads
+the user from the cache first, for ``AUTH_USER_CACHE_TIMEOUT`` seconds; the
+signals in ``accounts.signals`` delete the entry whenever the user is saved
+(password changes and logins included) or deleted. A per-process cache would
+only see such changes made by other processes when its entry expires, so
+settings only enable this backend by default with a shared ``CACHE_URL``.
+"""
+
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+
+def user_cache_key(user_id):
+    return f"auth-user:{user_id}"
+
+
+def invalidate_cached_user(user_id):
+    cache.delete(user_cache_key(user_id))
+
+
+class CachedModelBackend(ModelBackend):
+    def get_user(self, user_id):
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                cache.set(key, user, settings.AUTH_USER_CACHE_TIMEOUT)
+        return user
@@ -1,6 +1,14 @@
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
 from django.urls import reverse
-from django.test import TestCase
+from django.test import AsyncRequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from trackers.models import Tracker
+from trackers.stats import user_tracker_stats
+
+from .views import AsyncProfileDetailView
 
 
 # Create your tests here.
@@ -57,3 +65,161 @@ class SignUpPageTest(TestCase):
         self.assertEqual(get_user_model().objects.all().count(), 1)
         self.assertEqual(get_user_model().objects.all()[0].username, "testuser")
         self.assertEqual(get_user_model().objects.all()[0].email, "testuser@email.com")
+
+
+class ProfilePageTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.user = User.objects.create_user(username="owner", password="testpass1234")
+        cls.other = User.objects.create_user(username="other", password="testpass1234")
+        for status, priority in [
+            ("in_progress", "high"),
+            ("in_progress", "low"),
+            ("done", "low"),
+            ("drop", "normal"),
+        ]:
+            Tracker.objects.create(
+                author=cls.user, title="t", body="b", status=status, priority=priority
+            )
+        Tracker.objects.create(
+            author=cls.other, assigned_to=cls.user, title="t", body="b", priority="high"
+        )
+
+    def test_profile_counts(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("profile", kwargs={"pk": self.user.pk}))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["active_count"], 2)
+        self.assertEqual(response.context["done_count"], 1)
+        self.assertEqual(response.context["dropped_count"], 1)
+        stats = response.context["stats"]
+        self.assertEqual(stats["assigned"], {"in_progress": 1, "done": 0, "drop": 0})
+        self.assertEqual(stats["priority"], {"low": 1, "normal": 0, "high": 2})
+
+    def test_stats_are_one_query(self):
+        with self.assertNumQueries(1):
+            user_tracker_stats(self.user)
+
+    async def test_async_profile_view(self):
+        request = AsyncRequestFactory().get(f"/accounts/{self.user.pk}/profile/")
+
+        async def auser():
+            return self.user
+
+        request.auser = auser
+        response = await AsyncProfileDetailView.as_view()(request, pk=self.user.pk)
+        self.assertContains(response, "High 2")
+        self.assertContains(response, '<p class="display-6 fw-bold text-primary">2</p>')
+
+
+class UserAutocompleteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.user = User.objects.create_user(
+            username="Alice", email="alice@example.com", password="testpass1234"
+        )
+        User.objects.create_user(username="alan", email="zed@example.com")
+        User.objects.create_user(username="bob", email="al.bob@example.com")
+        User.objects.create_user(username="alfred", is_active=False)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def test_prefix_matches_username_or_email(self):
+        response = self.client.get(reverse("user_autocomplete"), {"q": "AL"})
+        self.assertEqual(
+            [user["username"] for user in response.context["users"]],
+            ["alan", "Alice", "bob"],
+        )
+        self.assertContains(response, f'data-user-id="{self.user.pk}"')
+
+    def test_results_are_cached(self):
+        self.client.get(reverse("user_autocomplete"), {"q": "bo"})
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("user_autocomplete"), {"q": "bo"})
+        self.assertEqual(len(response.context["users"]), 1)
+        self.assertFalse([q for q in queries if "username_lower" in q["sql"]])
+
+    def test_query_from_the_widgets_search_box(self):
+        response = self.client.get(
+            reverse("user_autocomplete"),
+            {"field": "assigned_to_search", "assigned_to_search": "bo", "q": "al"},
+        )
+        self.assertEqual(
+            [user["username"] for user in response.context["users"]], ["bob"]
+        )
+
+    def test_requires_login(self):
+        self.client.logout()
+        response = self.client.get(reverse("user_autocomplete"), {"q": "al"})
+        self.assertEqual(response.status_code, 302)
+
+    def test_tracker_forms_do_not_list_users(self):
+        tracker = Tracker.objects.create(author=self.user, title="t", body="b")
+        response = self.client.get(reverse("tracker_edit", args=[tracker.pk]))
+        self.assertNotContains(response, '<option value="%s"' % self.user.pk)
+        self.assertContains(response, 'name="assigned_to"')
+        # Not q, which the issue list uses for its search
+        self.assertContains(response, 'name="assigned_to_search"')
+        self.assertNotContains(response, 'name="q"')
+
+        bob = get_user_model().objects.get(username="bob")
+        self.client.post(
+            reverse("tracker_edit", args=[tracker.pk]),
+            {
+                "body": "b",
+                "priority": "normal",
+                "status": "in_progress",
+                "assigned_to": bob.pk,
+            },
+        )
+        tracker.refresh_from_db()
+        self.assertEqual(tracker.assigned_to, bob)
+        response = self.client.get(reverse("tracker_edit", args=[tracker.pk]))
+        self.assertContains(response, 'value="bob"')
+
+
+# What settings choose with a shared CACHE_URL
+@override_settings(
+    SESSION_ENGINE="django.contrib.sessions.backends.cached_db",
+    AUTHENTICATION_BACKENDS=["accounts.backends.CachedModelBackend"],
+    AUTH_USER_CACHE_TIMEOUT=300,
+)
+class CachedAuthenticationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(
+            username="owner", password="testpass1234"
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def issue_list_queries(self):
+        # A new client, as middleware reads the session engine once
+        client = self.client_class()
+        client.force_login(self.user)
+        client.get(reverse("all_issues"))  # fill the caches
+        with CaptureQueriesContext(connection) as queries:
+            client.get(reverse("all_issues"))
+        return len(queries)
+
+    def test_issue_list_skips_session_and_user_queries(self):
+        cached = self.issue_list_queries()
+        with self.settings(
+            SESSION_ENGINE="django.contrib.sessions.backends.db",
+            AUTHENTICATION_BACKENDS=["django.contrib.auth.backends.ModelBackend"],
+        ):
+            uncached = self.issue_list_queries()
+        self.assertEqual(uncached - cached, 2)
+
+    def test_password_change_signs_out_cached_user(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(reverse("all_issues")).status_code, 200)
+
+        self.user.set_password("another-pass-5678")
+        self.user.save()
+        self.assertEqual(self.client.get(reverse("all_issues")).status_code, 302)
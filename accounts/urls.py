@@ -1,8 +1,18 @@
+from django.conf import settings
 from django.urls import path
 
-from .views import SignUpView, ProfileDetailView
+from .views import (
+    AsyncProfileDetailView,
+    SignUpView,
+    ProfileDetailView,
+    user_autocomplete,
+)
+
+if settings.TRACKERS_ASYNC_VIEWS:
+    ProfileDetailView = AsyncProfileDetailView
 
 urlpatterns = [
     path("signup/", SignUpView.as_view(), name="signup"),
     path("<int:pk>/profile/", ProfileDetailView.as_view(), name="profile"),
+    path("autocomplete/", user_autocomplete, name="user_autocomplete"),
 ]
@@ -1,9 +1,14 @@
+from django.contrib.auth.decorators import login_required
+from django.shortcuts import aget_object_or_404, render
 from django.urls import reverse_lazy
+from django.views import View
 from django.views.generic import CreateView
 from django.views.generic import DetailView
 from django.contrib.auth import get_user_model
 
-from trackers.models import Tracker
+from plain_tracker.replicas import ReplicaReadsMixin
+from trackers.stats import auser_tracker_stats, user_tracker_stats
+from .autocomplete import matching_users
 from .forms import CustomUserCreationForm
 
 
@@ -17,22 +22,46 @@ class SignUpView(CreateView):
 User = get_user_model()
 
 
-class ProfileDetailView(DetailView):
+def profile_context(stats):
+    return {
+        "stats": stats,
+        "active_count": stats["authored"]["in_progress"],
+        "done_count": stats["authored"]["done"],
+        "dropped_count": stats["authored"]["drop"],
+    }
+
+
+class ProfileDetailView(ReplicaReadsMixin, DetailView):
     model = User
     template_name = "accounts/profile.html"
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        user = self.get_object()
-
-        context["active_count"] = Tracker.objects.filter(
-            author=user, status="in_progress"
-        ).count()
-        context["done_count"] = Tracker.objects.filter(
-            author=user, status="done"
-        ).count()
-        context["dropped_count"] = Tracker.objects.filter(
-            author=user, status="drop"
-        ).count()
-
+        context.update(profile_context(user_tracker_stats(self.object)))
         return context
+
+
+class AsyncProfileDetailView(ReplicaReadsMixin, View):
+    """``ProfileDetailView`` on the async ORM (TRACKERS_ASYNC_VIEWS)."""
+
+    async def get(self, request, pk):
+        request.user = await request.auser()
+        profile = await aget_object_or_404(User, pk=pk)
+        context = {"object": profile, "customuser": profile}
+        context.update(profile_context(await auser_tracker_stats(profile)))
+        return render(request, ProfileDetailView.template_name, context)
+
+
+@login_required
+def user_autocomplete(request):
+    """
+    Users matching ``q``, as options for ``UserAutocompleteWidget``. The
+    widget names its search box after its field so it doesn't clash with the
+    form it's in, and passes that name as ``field``.
+    """
+    query = request.GET.get(request.GET.get("field", "q"), "")
+    return render(
+        request,
+        "accounts/partials/user_options.html",
+        {"users": matching_users(query), "query": query},
+    )
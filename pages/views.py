@@ -1,11 +1,21 @@
 from django.views.generic import TemplateView
 from django.shortcuts import render
 
+from plain_tracker.replicas import ReplicaReadsMixin
+from trackers.stats import dashboard_stats
+
 
 # Create your views here.
-class HomePageView(TemplateView):
+class HomePageView(ReplicaReadsMixin, TemplateView):
     template_name = "pages/home.html"
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        if self.request.user.is_authenticated:
+            # Read from the statistics tables, not the trackers
+            context["dashboard"] = dashboard_stats()
+        return context
+
 
 class AboutPageView(TemplateView):
     template_name = "pages/about.html"
@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class PlainTrackerConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "plain_tracker"
+
+    def ready(self):
+        from . import database  # noqa: F401
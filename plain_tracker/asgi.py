@@ -12,5 +12,9 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "plain_tracker.settings")
+# Sync code runs in a new thread per request under ASGI, and each thread keeps
+# its own persistent connection until it is gone: close them after every
+# request instead (see DATABASE_CONN_MAX_AGE in settings).
+os.environ.setdefault("DATABASE_CONN_MAX_AGE", "0")
 
 application = get_asgi_application()
@@ -0,0 +1,33 @@
+"""
+Per-connection database setup.
+
+SQLite keeps most of its tuning per connection, so ``SQLITE_PRAGMAS`` is
+applied whenever Django opens one. With persistent connections
+(``CONN_MAX_AGE``) that is once per connection rather than once per request.
+"""
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+def pragma_statements(pragmas):
+    # PRAGMA takes no query parameters; the values come from settings
+    for name, value in pragmas.items():
+        if not name.isidentifier():
+            raise ValueError(f"Invalid PRAGMA name {name!r}")
+        if not str(value).isalnum():
+            raise ValueError(f"Invalid value for PRAGMA {name}: {value!r}")
+        yield f"PRAGMA {name} = {value}"
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    if connection.vendor != "sqlite":
+        return
+    # In-memory databases are always journal_mode=memory
+    if connection.is_in_memory_db():
+        return
+    with connection.cursor() as cursor:
+        for statement in pragma_statements(settings.SQLITE_PRAGMAS):
+            cursor.execute(statement)
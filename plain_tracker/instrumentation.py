@@ -0,0 +1,309 @@
+"""
+Per-request performance instrumentation.
+
+``InstrumentationMiddleware`` measures a sample of requests
+(``INSTRUMENTATION_SAMPLE_RATE``): wall time, database time and query count,
+queries repeated within the request, template render time and response size.
+Measured responses get a ``Server-Timing`` header, and the numbers are added
+to per-view histograms kept in this process; staff (or a scraper sending
+``INSTRUMENTATION_METRICS_TOKEN``) read them from ``metrics`` in Prometheus
+text format, or as JSON with ``?format=json``. Each worker process keeps its
+own histograms.
+
+Queries are timed by an execute wrapper installed on every new database
+connection, and templates by the ``InstrumentedDjangoTemplates`` backend.
+Outside a measured request both only check a context variable; with a sample
+rate of 0 the middleware removes itself.
+"""
+
+import logging
+import random
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, Template, reraise
+from django.utils.crypto import constant_time_compare
+
+logger = logging.getLogger(__name__)
+
+_current = ContextVar("request_metrics", default=None)
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.db_time = 0.0
+        self.queries = 0
+        self.statements = Counter()
+        self.template_time = 0.0
+        self.rendering = False
+
+    @property
+    def duplicate_queries(self):
+        return sum(count - 1 for count in self.statements.values())
+
+
+# ----------------------------
+# Database and template timing
+# ----------------------------
+def record_query(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.db_time += time.perf_counter() - start
+        metrics.queries += 1
+        if not many:
+            metrics.statements[(sql, repr(params))] += 1
+
+
+@receiver(connection_created)
+def install_query_recorder(sender, connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class InstrumentedTemplate(Template):
+    def render(self, context=None, request=None):
+        metrics = _current.get()
+        # Only time the outermost render; includes are part of it
+        if metrics is None or metrics.rendering:
+            return super().render(context, request)
+        metrics.rendering = True
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics.template_time += time.perf_counter() - start
+            metrics.rendering = False
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """The Django template backend, timing renders for the middleware."""
+
+    def from_string(self, template_code):
+        return InstrumentedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return InstrumentedTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
+
+
+# ----------------------------
+# Histograms
+# ----------------------------
+TIME_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# name: (help, buckets)
+METRICS = {
+    "request_duration_seconds": (
+        "Time spent in the view and middleware.",
+        TIME_BUCKETS,
+    ),
+    "db_duration_seconds": ("Time spent running database queries.", TIME_BUCKETS),
+    "template_duration_seconds": ("Time spent rendering templates.", TIME_BUCKETS),
+    "db_queries": ("Database queries per request.", (1, 2, 5, 10, 20, 50, 100, 200)),
+    "duplicate_queries": (
+        "Queries per request repeating an earlier one with the same parameters.",
+        (0, 1, 2, 5, 10, 20, 50),
+    ),
+    "response_size_bytes": (
+        "Size of non-streaming response bodies.",
+        (1024, 4096, 16384, 65536, 262144, 1048576, 4194304),
+    ),
+}
+METRIC_PREFIX = "plain_tracker_"
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last one is +Inf
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip([*self.buckets, "+Inf"], self.counts):
+            total += count
+            yield bound, total
+
+
+class MetricsRegistry:
+    """Histograms per metric and view, shared by the threads of a process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+
+    def observe(self, view, values):
+        with self._lock:
+            for name, value in values.items():
+                key = (name, view)
+                if key not in self._histograms:
+                    self._histograms[key] = Histogram(METRICS[name][1])
+                self._histograms[key].observe(value)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+    def _by_metric(self):
+        with self._lock:
+            items = sorted(self._histograms.items())
+            return [
+                (name, view, list(histogram.cumulative()), histogram)
+                for (name, view), histogram in items
+            ]
+
+    def as_prometheus(self):
+        lines = []
+        current = None
+        for name, view, buckets, histogram in self._by_metric():
+            metric = METRIC_PREFIX + name
+            if name != current:
+                current = name
+                lines.append(f"# HELP {metric} {METRICS[name][0]}")
+                lines.append(f"# TYPE {metric} histogram")
+            label = 'view="%s"' % escape_label(view)
+            for bound, count in buckets:
+                lines.append(f'{metric}_bucket{{{label},le="{bound}"}} {count}')
+            lines.append(f"{metric}_sum{{{label}}} {histogram.sum}")
+            lines.append(f"{metric}_count{{{label}}} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def as_dict(self):
+        views = {}
+        for name, view, buckets, histogram in self._by_metric():
+            views.setdefault(view, {})[name] = {
+                "count": histogram.count,
+                "sum": histogram.sum,
+                "buckets": {str(bound): count for bound, count in buckets},
+            }
+        return views
+
+
+def escape_label(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+registry = MetricsRegistry()
+
+
+# ----------------------------
+# Middleware and endpoint
+# ----------------------------
+class InstrumentationMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.INSTRUMENTATION_SAMPLE_RATE:
+            raise MiddlewareNotUsed
+        # Connections opened before this module was loaded
+        for connection in connections.all(initialized_only=True):
+            install_query_recorder(None, connection)
+        self.get_response = get_response
+        self.sample_rate = settings.INSTRUMENTATION_SAMPLE_RATE
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.finish(request, response, metrics)
+        return response
+
+    async def __acall__(self, request):
+        if random.random() >= self.sample_rate:
+            return await self.get_response(request)
+
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.finish(request, response, metrics)
+        return response
+
+    def finish(self, request, response, metrics):
+        duration = time.perf_counter() - metrics.start
+        match = request.resolver_match
+        view = match.view_name if match else "<unresolved>"
+        duplicates = metrics.duplicate_queries
+
+        values = {
+            "request_duration_seconds": duration,
+            "db_duration_seconds": metrics.db_time,
+            "template_duration_seconds": metrics.template_time,
+            "db_queries": metrics.queries,
+            "duplicate_queries": duplicates,
+        }
+        if not response.streaming:
+            values["response_size_bytes"] = len(response.content)
+        registry.observe(view, values)
+
+        if settings.INSTRUMENTATION_SERVER_TIMING:
+            response["Server-Timing"] = (
+                f"total;dur={duration * 1000:.1f}, "
+                f'db;dur={metrics.db_time * 1000:.1f};desc="{metrics.queries} '
+                f'queries, {duplicates} duplicate", '
+                f"tpl;dur={metrics.template_time * 1000:.1f}"
+            )
+
+        if duplicates >= settings.INSTRUMENTATION_DUPLICATE_QUERY_WARNING:
+            (sql, _), count = metrics.statements.most_common(1)[0]
+            logger.warning(
+                "%s ran %d duplicate queries; repeated %d times: %s",
+                view,
+                duplicates,
+                count,
+                sql[:300],
+            )
+
+
+def metrics(request):
+    """The collected histograms, for staff users or the metrics token."""
+    token = settings.INSTRUMENTATION_METRICS_TOKEN
+    authorization = request.headers.get("Authorization", "")
+    has_token = token and constant_time_compare(authorization, f"Bearer {token}")
+    if not (has_token or request.user.is_staff):
+        return HttpResponseForbidden()
+
+    if request.GET.get("format") == "json":
+        return JsonResponse(registry.as_dict())
+    return HttpResponse(
+        registry.as_prometheus(), content_type="text/plain; version=0.0.4"
+    )
@@ -0,0 +1,104 @@
+"""
+Read replicas.
+
+The databases in ``DATABASE_REPLICAS`` (one per URL in
+``DATABASE_REPLICA_URLS``) take the reads of views using ``ReplicaReadsMixin``
+and of code run inside ``reading_from_replica()``, such as exports. Every
+other query, and every write, goes to ``default``.
+
+Replicas lag behind ``default``. After any request that may have written
+(anything but GET, HEAD or OPTIONS), ``ReplicaMiddleware`` sets a cookie that
+keeps that browser's reads on ``default`` for
+``DATABASE_REPLICA_STICKY_SECONDS``, so people see their own changes.
+
+To try it locally, copy the SQLite database and point a replica at the copy::
+
+    sqlite3 db.sqlite3 ".backup replica.sqlite3"
+    DATABASE_REPLICA_URLS=sqlite:///replica.sqlite3
+
+Pages served from the replica then show the data as it was when copied, until
+you post something.
+"""
+
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.deprecation import MiddlewareMixin
+
+STICKY_COOKIE = "use_primary"
+
+_reading = ContextVar("replica_reads", default=False)
+
+
+@contextmanager
+def reading_from_replica(enabled=True):
+    """Send the reads made inside the block to a replica."""
+    token = _reading.set(enabled)
+    try:
+        yield
+    finally:
+        _reading.reset(token)
+
+
+def wants_replica(request):
+    return request.method in ("GET", "HEAD") and STICKY_COOKIE not in request.COOKIES
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if _reading.get() and settings.DATABASE_REPLICAS:
+            return random.choice(settings.DATABASE_REPLICAS)
+        # Related objects are then read from where their instance came from
+        return None
+
+    def db_for_write(self, model, **hints):
+        # Objects read from a replica are still saved to the primary
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == "default"
+
+
+class ReplicaReadsMixin:
+    """Serve GET and HEAD requests from a replica, unless the browser wrote recently."""
+
+    def dispatch(self, request, *args, **kwargs):
+        use_replica = wants_replica(request)
+        if self.view_is_async:
+
+            async def dispatch():
+                with reading_from_replica(use_replica):
+                    return await super(ReplicaReadsMixin, self).dispatch(
+                        request, *args, **kwargs
+                    )
+
+            return dispatch()
+        with reading_from_replica(use_replica):
+            return super().dispatch(request, *args, **kwargs)
+
+
+class ReplicaMiddleware(MiddlewareMixin):
+    """Keep a browser's reads on the primary for a while after it writes."""
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    def process_response(self, request, response):
+        if request.method not in ("GET", "HEAD", "OPTIONS"):
+            response.set_cookie(
+                STICKY_COOKIE,
+                "1",
+                max_age=settings.DATABASE_REPLICA_STICKY_SECONDS,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
@@ -51,6 +51,7 @@ INSTALLED_APPS = [
     "whitenoise.runserver_nostatic",
     "django.contrib.staticfiles",
     # local
+    "plain_tracker",
     "pages",
     "accounts",
     "trackers",
@@ -60,6 +61,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "plain_tracker.instrumentation.InstrumentationMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
@@ -68,13 +70,26 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "plain_tracker.replicas.ReplicaMiddleware",
 ]
 
+# Request instrumentation (see plain_tracker.instrumentation)
+# Fraction of requests measured; 0 turns the middleware off
+INSTRUMENTATION_SAMPLE_RATE = env.float("INSTRUMENTATION_SAMPLE_RATE", default=1.0)
+INSTRUMENTATION_SERVER_TIMING = env.bool("INSTRUMENTATION_SERVER_TIMING", default=True)
+# Log a warning when one request repeats this many queries
+INSTRUMENTATION_DUPLICATE_QUERY_WARNING = env.int(
+    "INSTRUMENTATION_DUPLICATE_QUERY_WARNING", default=10
+)
+# Lets a Prometheus scraper read /metrics/ with "Authorization: Bearer <token>"
+INSTRUMENTATION_METRICS_TOKEN = env("INSTRUMENTATION_METRICS_TOKEN", default="")
+
 ROOT_URLCONF = "plain_tracker.urls"
 
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        # Django templates, timed for the instrumentation middleware
+        "BACKEND": "plain_tracker.instrumentation.InstrumentedDjangoTemplates",
         "DIRS": [BASE_DIR / "templates"],
         "APP_DIRS": True,
         "OPTIONS": {
@@ -102,6 +117,93 @@ WSGI_APPLICATION = "plain_tracker.wsgi.application"
 DATABASES = {
     "default": env.db(),
 }
+if DATABASES["default"]["ENGINE"] == "django.db.backends.sqlite3":
+    # Tests run on an in-memory database; those that write from several
+    # threads copy it to a file first. Set TEST_DATABASE_NAME (e.g.
+    # test_db.sqlite3) to run them all on a file, including the ones checking
+    # file-only pragmas, which are skipped otherwise.
+    if env("TEST_DATABASE_NAME", default=""):
+        DATABASES["default"].setdefault(
+            "TEST", {"NAME": BASE_DIR / env("TEST_DATABASE_NAME")}
+        )
+
+# Keep connections open between requests for this many seconds (0 closes them
+# after every request; a conn_max_age in DATABASE_URL wins). asgi.py defaults
+# it to 0: every request runs in its own thread there, so use DATABASE_POOL on
+# PostgreSQL instead.
+DATABASES["default"].setdefault(
+    "CONN_MAX_AGE", env.int("DATABASE_CONN_MAX_AGE", default=60)
+)
+# Check a reused connection still works before the request uses it
+DATABASES["default"]["CONN_HEALTH_CHECKS"] = env.bool(
+    "DATABASE_CONN_HEALTH_CHECKS", default=True
+)
+if DATABASES["default"]["ENGINE"] in (
+    "django.db.backends.postgresql",
+    "django.contrib.gis.db.backends.postgis",
+) and env.bool("DATABASE_POOL", default=False):
+    # psycopg's connection pool (needs psycopg[pool]). Connections go back to
+    # the pool after each request, which replaces persistent connections.
+    DATABASES["default"].setdefault("OPTIONS", {})
+    DATABASES["default"]["OPTIONS"]["pool"] = {
+        "min_size": env.int("DATABASE_POOL_MIN_SIZE", default=2),
+        "max_size": env.int("DATABASE_POOL_MAX_SIZE", default=10),
+        # Seconds a request waits for a free connection before failing
+        "timeout": env.int("DATABASE_POOL_TIMEOUT", default=10),
+    }
+    DATABASES["default"]["CONN_MAX_AGE"] = 0
+
+# Read replicas, comma separated: reads of the list, profile and detail pages
+# and of exports go to one of them (see plain_tracker.replicas)
+for number, url in enumerate(env.list("DATABASE_REPLICA_URLS", default=[]), 1):
+    replica = env.db_url_config(url)
+    replica.setdefault("CONN_MAX_AGE", DATABASES["default"]["CONN_MAX_AGE"])
+    replica["CONN_HEALTH_CHECKS"] = DATABASES["default"]["CONN_HEALTH_CHECKS"]
+    # Tests read the test database instead
+    replica["TEST"] = {"MIRROR": "default"}
+    DATABASES[f"replica{number}"] = replica
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != "default"]
+DATABASE_ROUTERS = ["plain_tracker.replicas.ReplicaRouter"]
+# Seconds a browser keeps reading from the primary after it writes
+DATABASE_REPLICA_STICKY_SECONDS = env.int("DATABASE_REPLICA_STICKY_SECONDS", default=10)
+
+# PRAGMAs run on every new SQLite connection (see plain_tracker.database).
+# WAL lets readers carry on while a write is in progress, and with it
+# synchronous=NORMAL only syncs at checkpoints; mmap_size is in bytes.
+SQLITE_PRAGMAS = {
+    "journal_mode": env("SQLITE_JOURNAL_MODE", default="wal"),
+    "synchronous": env("SQLITE_SYNCHRONOUS", default="normal"),
+    # Milliseconds to wait for a lock before "database is locked"
+    "busy_timeout": env.int("SQLITE_BUSY_TIMEOUT", default=5000),
+    "mmap_size": env.int("SQLITE_MMAP_SIZE", default=128 * 1024 * 1024),
+}
+if DATABASES["default"]["ENGINE"] == "django.db.backends.sqlite3":
+    # atomic() blocks start with BEGIN IMMEDIATE, taking the write lock up
+    # front. A deferred transaction that reads and then writes (allocating a
+    # tracker_id, saving a comment and its search document) gets "database is
+    # locked" straight away when another connection wrote in between, since
+    # busy_timeout cannot help a stale WAL snapshot. Read-only atomic blocks
+    # queue behind writers too; reads outside transactions are unaffected.
+    DATABASES["default"].setdefault("OPTIONS", {})
+    DATABASES["default"]["OPTIONS"].setdefault(
+        "transaction_mode", env("SQLITE_TRANSACTION_MODE", default="IMMEDIATE")
+    )
+
+
+# Cache
+# Local memory by default; set CACHE_URL (e.g. redis://, memcache://) to share
+# it between processes.
+CACHES = {
+    "default": env.cache("CACHE_URL", default="locmemcache://"),
+}
+# Whether every process reads the same cache (Redis or Memcached)
+SHARED_CACHE = any(
+    name in CACHES["default"]["BACKEND"].lower() for name in ("redis", "memcached")
+)
+# Rendered tracker cards on the issue list (seconds)
+TRACKERS_CARD_CACHE_TIMEOUT = env.int("TRACKERS_CARD_CACHE_TIMEOUT", default=3600)
+# User autocomplete results per prefix (seconds); new users show up after this
+USER_AUTOCOMPLETE_CACHE_TIMEOUT = env.int("USER_AUTOCOMPLETE_CACHE_TIMEOUT", default=60)
 
 
 # Password validation
@@ -160,6 +262,44 @@ AUTH_USER_MODEL = "accounts.CustomUser"
 LOGIN_REDIRECT_URL = "home"
 LOGOUT_REDIRECT_URL = "home"
 
+# Sessions and users are read on every request. With a shared CACHE_URL
+# (Redis or Memcached) both come from the cache by default: cached_db reads
+# sessions from the cache and writes through to the database. With the
+# per-process local-memory cache they come from the database, since another
+# process would keep serving a session or user changed elsewhere (a logout, a
+# password change) until its copy expired.
+SESSION_ENGINE = "django.contrib.sessions.backends." + env(
+    "SESSION_ENGINE", default="cached_db" if SHARED_CACHE else "db"
+)
+# Keep logged-in users in the cache for this many seconds; 0 loads them from
+# the database on every request. Changing it signs everyone out once, as
+# sessions remember the backend that logged them in.
+AUTH_USER_CACHE_TIMEOUT = env.int(
+    "AUTH_USER_CACHE_TIMEOUT", default=300 if SHARED_CACHE else 0
+)
+if AUTH_USER_CACHE_TIMEOUT:
+    AUTHENTICATION_BACKENDS = ["accounts.backends.CachedModelBackend"]
+
+# Serve the issue list, tracker detail and profile pages from async views
+# (worth it when running under ASGI; under WSGI each runs in its own loop)
+TRACKERS_ASYNC_VIEWS = env.bool("TRACKERS_ASYNC_VIEWS", default=False)
+
+# Number of trackers per page on the issue list (loaded on scroll)
+TRACKERS_PAGE_SIZE = env.int("TRACKERS_PAGE_SIZE", default=20)
+# Comments per page on the tracker detail page
+TRACKERS_COMMENTS_PAGE_SIZE = env.int("TRACKERS_COMMENTS_PAGE_SIZE", default=20)
+# Trackers done or dropped this many days ago are moved to the archive by
+# the archive_trackers command (schedule it, e.g. daily)
+TRACKERS_ARCHIVE_AFTER_DAYS = env.int("TRACKERS_ARCHIVE_AFTER_DAYS", default=90)
+# Live updates on the tracker detail page
+TRACKERS_EVENT_BROKER = env(
+    "TRACKERS_EVENT_BROKER", default="trackers.events.InProcessBroker"
+)
+TRACKERS_EVENTS_HEARTBEAT = env.int("TRACKERS_EVENTS_HEARTBEAT", default=15)
+TRACKERS_EVENTS_POLL_TIMEOUT = env.int("TRACKERS_EVENTS_POLL_TIMEOUT", default=25)
+# How long EventSource waits before reconnecting (WSGI closes every stream)
+TRACKERS_EVENTS_RETRY_MS = env.int("TRACKERS_EVENTS_RETRY_MS", default=5000)
+
 CRISPY_ALLOWED_TEMPLATE_PACKS = "bootstrap5"
 CRISPY_TEMPLATE_PACK = "bootstrap5"
 
@@ -172,6 +312,21 @@ import os
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
+# Uploads are streamed to disk and cut off early once over these limits
+FILE_UPLOAD_HANDLERS = ["trackers.uploads.LimitedUploadHandler"]
+TRACKERS_UPLOAD_MAX_FILE_SIZE = env.int(
+    "TRACKERS_UPLOAD_MAX_FILE_SIZE", default=10 * 1024 * 1024
+)
+TRACKERS_UPLOAD_MAX_REQUEST_SIZE = env.int(
+    "TRACKERS_UPLOAD_MAX_REQUEST_SIZE", default=30 * 1024 * 1024
+)
+# Larger originals are downscaled to fit this box before they are stored
+TRACKERS_UPLOAD_MAX_DIMENSION = env.int("TRACKERS_UPLOAD_MAX_DIMENSION", default=2560)
+
+# Image renditions: "thread" (in-process workers), "sync" or a dotted path
+TRACKERS_THUMBNAIL_QUEUE = env("TRACKERS_THUMBNAIL_QUEUE", default="thread")
+TRACKERS_THUMBNAIL_WORKERS = env.int("TRACKERS_THUMBNAIL_WORKERS", default=2)
+
 from django.contrib.messages import constants as messages
 
 MESSAGE_TAGS = {
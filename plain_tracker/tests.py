@@ -0,0 +1,205 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from trackers.models import Tracker
+
+from .database import pragma_statements
+from .instrumentation import RequestMetrics, _current, registry
+from .replicas import STICKY_COOKIE, ReplicaRouter, reading_from_replica
+
+
+class InstrumentationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.user = User.objects.create_user(username="owner", password="testpass1234")
+        cls.staff = User.objects.create_user(
+            username="staff", password="testpass1234", is_staff=True
+        )
+        Tracker.objects.create(author=cls.user, title="t", body="b")
+
+    def setUp(self):
+        registry.reset()
+
+    def test_server_timing_header(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("all_issues"))
+        timing = response["Server-Timing"]
+        self.assertRegex(timing, r"total;dur=[\d.]+")
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="[1-9]\d* queries')
+        self.assertRegex(timing, r"tpl;dur=[\d.]+")
+
+    @override_settings(INSTRUMENTATION_SAMPLE_RATE=0)
+    def test_sampling_off(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("all_issues"))
+        self.assertNotIn("Server-Timing", response)
+        self.assertEqual(registry.as_dict(), {})
+
+    def test_metrics_endpoint(self):
+        self.client.force_login(self.user)
+        self.client.get(reverse("all_issues"))
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 403)
+
+        self.client.force_login(self.staff)
+        body = self.client.get(reverse("metrics")).content.decode()
+        self.assertIn("# TYPE plain_tracker_request_duration_seconds histogram", body)
+        self.assertIn(
+            'plain_tracker_db_queries_count{view="all_issues"} 1', body.splitlines()
+        )
+        self.assertIn(
+            'plain_tracker_response_size_bytes_bucket{view="all_issues",le="+Inf"} 1',
+            body,
+        )
+
+        data = self.client.get(reverse("metrics"), {"format": "json"}).json()
+        self.assertEqual(data["all_issues"]["request_duration_seconds"]["count"], 1)
+
+    @override_settings(INSTRUMENTATION_METRICS_TOKEN="s3cret")
+    def test_metrics_token(self):
+        url = reverse("metrics")
+        self.assertEqual(self.client.get(url).status_code, 403)
+        response = self.client.get(url, headers={"Authorization": "Bearer s3cret"})
+        self.assertEqual(response.status_code, 200)
+
+    def test_duplicate_queries(self):
+        self.client.get("/")  # make sure the query recorder is installed
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            for pk in (1, 1, 1, 2):
+                Tracker.objects.filter(pk=pk).exists()
+        finally:
+            _current.reset(token)
+        self.assertEqual(metrics.queries, 4)
+        self.assertEqual(metrics.duplicate_queries, 2)
+        self.assertGreater(metrics.db_time, 0)
+
+
+class DatabaseTests(TestCase):
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f"PRAGMA {name}")
+            return cursor.fetchone()[0]
+
+    def test_sqlite_pragmas(self):
+        if connection.vendor != "sqlite":
+            self.skipTest("SQLite only")
+        if connection.is_in_memory_db():
+            self.skipTest("needs a file database, set TEST_DATABASE_NAME")
+        pragmas = settings.SQLITE_PRAGMAS
+        self.assertEqual(self.pragma("journal_mode"), pragmas["journal_mode"].lower())
+        synchronous = ["off", "normal", "full", "extra"]
+        self.assertEqual(
+            synchronous[self.pragma("synchronous")], pragmas["synchronous"].lower()
+        )
+        self.assertEqual(self.pragma("busy_timeout"), pragmas["busy_timeout"])
+
+
+class PragmaStatementTests(SimpleTestCase):
+    def test_statements(self):
+        self.assertEqual(
+            list(pragma_statements({"journal_mode": "wal", "busy_timeout": 5000})),
+            ["PRAGMA journal_mode = wal", "PRAGMA busy_timeout = 5000"],
+        )
+
+    def test_rejects_unsafe_values(self):
+        with self.assertRaises(ValueError):
+            list(pragma_statements({"journal_mode": "wal; DROP TABLE x"}))
+        with self.assertRaises(ValueError):
+            list(pragma_statements({"journal_mode = wal; --": "wal"}))
+
+
+class RecordingRouter(ReplicaRouter):
+    reads = []
+
+    def db_for_read(self, model, **hints):
+        database = super().db_for_read(model, **hints)
+        self.reads.append(database)
+        return database
+
+
+class ReplicaRouterTests(SimpleTestCase):
+    router = ReplicaRouter()
+
+    @override_settings(DATABASE_REPLICAS=["replica1", "replica2"])
+    def test_reads(self):
+        self.assertIsNone(self.router.db_for_read(Tracker))
+        with reading_from_replica():
+            self.assertIn(self.router.db_for_read(Tracker), ["replica1", "replica2"])
+            self.assertEqual(self.router.db_for_write(Tracker), "default")
+            with reading_from_replica(False):
+                self.assertIsNone(self.router.db_for_read(Tracker))
+        self.assertIsNone(self.router.db_for_read(Tracker))
+
+    def test_no_replicas(self):
+        with reading_from_replica():
+            self.assertIsNone(self.router.db_for_read(Tracker))
+
+    def test_migrations_only_on_primary(self):
+        self.assertTrue(self.router.allow_migrate("default", "trackers"))
+        self.assertFalse(self.router.allow_migrate("replica1", "trackers"))
+
+
+# "default" stands in for the replica: the router returns it for reads sent to
+# a replica and None otherwise.
+@override_settings(
+    DATABASE_REPLICAS=["default"],
+    DATABASE_ROUTERS=["plain_tracker.tests.RecordingRouter"],
+)
+class ReplicaReadsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(
+            username="owner", password="testpass1234"
+        )
+        cls.tracker = Tracker.objects.create(author=cls.user, title="t", body="b")
+
+    def setUp(self):
+        RecordingRouter.reads = []
+        self.client.force_login(self.user)
+
+    def test_read_views_use_replica(self):
+        for url in [
+            reverse("all_issues"),
+            reverse("tracker_detail", kwargs={"pk": self.tracker.pk}),
+            reverse("profile", kwargs={"pk": self.user.pk}),
+        ]:
+            RecordingRouter.reads = []
+            self.assertEqual(self.client.get(url).status_code, 200)
+            self.assertIn("default", RecordingRouter.reads, url)
+
+    def test_primary_after_write(self):
+        response = self.client.post(
+            reverse("add_comment", kwargs={"pk": self.tracker.pk}), {"body": "hi"}
+        )
+        self.assertContains(response, "hi")
+        self.assertNotIn("default", RecordingRouter.reads)
+        cookie = response.cookies[STICKY_COOKIE]
+        self.assertEqual(cookie["max-age"], settings.DATABASE_REPLICA_STICKY_SECONDS)
+
+        RecordingRouter.reads = []
+        response = self.client.get(reverse("all_issues"))
+        self.assertContains(response, "t")
+        self.assertTrue(RecordingRouter.reads)
+        self.assertNotIn("default", RecordingRouter.reads)
+
+    def test_export_streams_from_replica(self):
+        response = self.client.get(reverse("tracker_export"), {"format": "jsonl"})
+        # The database is picked in the view ...
+        self.assertIn("default", RecordingRouter.reads)
+        RecordingRouter.reads = []
+        body = b"".join(response.streaming_content)
+        self.assertIn(b'"title": "t"', body)
+        # ... and comments follow their trackers there
+        self.assertNotIn("default", RecordingRouter.reads)
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_replicas(self):
+        response = self.client.post(
+            reverse("add_comment", kwargs={"pk": self.tracker.pk}), {"body": "hi"}
+        )
+        self.assertNotIn(STICKY_COOKIE, response.cookies)
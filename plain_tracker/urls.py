@@ -21,8 +21,11 @@ from django.views.generic.base import TemplateView  # this is for temporary only
 from django.conf import settings
 from django.conf.urls.static import static
 
+from .instrumentation import metrics
+
 urlpatterns = [
     path("admin/", admin.site.urls),
+    path("metrics/", metrics, name="metrics"),
     path("accounts/", include("accounts.urls")),
     path("accounts/", include("django.contrib.auth.urls")),
     # path("", TemplateView.as_view(template_name="home.html"), name="home"),
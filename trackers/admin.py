@@ -1,11 +1,97 @@
+from math import ceil
+
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.forms.models import BaseInlineFormSet
+from django.utils.functional import cached_property
+from django.utils.html import format_html, format_html_join
+from django.utils.text import Truncator
+
+from .models import ArchivedTracker, Tracker, Comment, TrackerImage
+
+# Below this many rows an exact COUNT(*) is cheap enough
+ESTIMATE_COUNTS_ABOVE = 100_000
+
+
+# ----------------------------
+# Large tables
+# ----------------------------
+def estimated_count(queryset):
+    """
+    The planner's row estimate for an unfiltered queryset on PostgreSQL;
+    None when there is no usable estimate.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql" or queryset.query.where:
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT reltuples::bigint FROM pg_class WHERE relname = %s",
+            [queryset.model._meta.db_table],
+        )
+        row = cursor.fetchone()
+    # -1 when the table has never been analysed
+    return row[0] if row and row[0] > 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """Counts unfiltered changelists of huge tables from planner statistics."""
+
+    @cached_property
+    def count(self):
+        estimate = estimated_count(self.object_list)
+        if estimate is not None and estimate > ESTIMATE_COUNTS_ABOVE:
+            return estimate
+        return super().count
+
 
-from .models import Tracker, Comment, TrackerImage
+class LargeTableAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    # Skip the extra unfiltered COUNT(*) shown next to filtered results
+    show_full_result_count = False
+
+
+def truncated(text, words=12):
+    return Truncator(text).words(words)
+
+
+# ----------------------------
+# Inlines
+# ----------------------------
+class PaginatedInlineFormSet(BaseInlineFormSet):
+    per_page = 20
+    page = 1
+
+    def get_queryset(self):
+        if not hasattr(self, "_page_queryset"):
+            start = (self.page - 1) * self.per_page
+            queryset = super().get_queryset()
+            self._page_queryset = queryset[start : start + self.per_page]
+        return self._page_queryset
 
 
 class CommentInLine(admin.TabularInline):
     model = Comment
+    formset = PaginatedInlineFormSet
     extra = 0
+    fields = ["author", "body", "image", "created_at"]
+    # An editable author would look itself up once per row; comments added
+    # here are by the admin (see TrackerAdmin.save_formset)
+    readonly_fields = ["author", "created_at"]
+    ordering = ["-created_at", "-pk"]
+    page_param = "comments_page"
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related("author")
+
+    def get_formset(self, request, obj=None, **kwargs):
+        formset = super().get_formset(request, obj, **kwargs)
+        try:
+            formset.page = max(int(request.GET.get(self.page_param, 1)), 1)
+        except ValueError:
+            pass
+        return formset
 
 
 class TrackerImageInline(admin.TabularInline):
@@ -13,13 +99,17 @@ class TrackerImageInline(admin.TabularInline):
     extra = 1
 
 
-class TrackerAdmin(admin.ModelAdmin):
+# ----------------------------
+# Model admins
+# ----------------------------
+class TrackerAdmin(LargeTableAdmin):
     inlines = [
         CommentInLine,
     ]
     list_display = [
+        "tracker_id",
         "title",
-        "body",
+        "short_body",
         "author",
         "assigned_to",
         "priority",
@@ -27,9 +117,96 @@ class TrackerAdmin(admin.ModelAdmin):
         "date",
         "updated_at",
     ]
+    list_select_related = ["author", "assigned_to"]
+    # Both filters have an index leading with the column, ordered by date
+    list_filter = ["status", "priority"]
+    search_fields = ["tracker_id", "title"]
+    autocomplete_fields = ["author", "assigned_to"]
+    readonly_fields = ["comment_pages"]
+
+    @admin.display(description="Body")
+    def short_body(self, obj):
+        return truncated(obj.body)
+
+    def save_formset(self, request, form, formset, change):
+        for comment in formset.save(commit=False):
+            if comment.author_id is None:
+                comment.author = request.user
+            comment.save()
+        for comment in formset.deleted_objects:
+            comment.delete()
+
+    def get_search_results(self, request, queryset, search_term):
+        # The full-text index instead of LIKE over every row
+        if not search_term:
+            return queryset, False
+        return queryset.search(search_term), False
+
+    @admin.display(description="Comments")
+    def comment_pages(self, obj):
+        if obj.pk is None:
+            return "-"
+        total = obj.comment_set.count()
+        per_page = PaginatedInlineFormSet.per_page
+        pages = range(1, min(ceil(total / per_page), 50) + 1)
+        links = format_html_join(
+            " ",
+            '<a href="?{}={}">{}</a>',
+            ((CommentInLine.page_param, page, page) for page in pages),
+        )
+        return format_html("{} comments, {} per page: {}", total, per_page, links)
+
+
+class CommentAdmin(LargeTableAdmin):
+    list_display = ["tracker", "author", "short_body", "created_at"]
+    list_select_related = ["tracker", "author"]
+    search_fields = ["=tracker__tracker_id"]
+    autocomplete_fields = ["tracker", "author"]
+    # The primary key follows creation order and needs no extra index
+    ordering = ["-pk"]
+
+    @admin.display(description="Body")
+    def short_body(self, obj):
+        return truncated(obj.body)
+
+
+class TrackerImageAdmin(LargeTableAdmin):
+    list_display = ["tracker", "image", "renditions_ready", "upload_at"]
+    list_select_related = ["tracker"]
+    list_filter = ["renditions_ready"]
+    search_fields = ["=tracker__tracker_id"]
+    autocomplete_fields = ["tracker"]
+    ordering = ["-pk"]
+
+
+class ArchivedTrackerAdmin(LargeTableAdmin):
+    list_display = [
+        "tracker_id",
+        "title",
+        "author",
+        "status",
+        "closed_at",
+        "archived_at",
+    ]
+    list_select_related = ["author"]
+    list_filter = ["status"]
+    search_fields = ["=tracker_id"]
+    ordering = ["-pk"]
+
+    # Read-only: trackers leave the archive by being reopened. Deleting here
+    # would leave them counted in the dashboard statistics.
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
 
 
 # Register your models here.
 admin.site.register(Tracker, TrackerAdmin)
-admin.site.register(Comment)
-admin.site.register(TrackerImage)
+admin.site.register(Comment, CommentAdmin)
+admin.site.register(TrackerImage, TrackerImageAdmin)
+admin.site.register(ArchivedTracker, ArchivedTrackerAdmin)
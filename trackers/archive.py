@@ -0,0 +1,126 @@
+"""
+Archive of long-closed trackers.
+
+``archive_trackers`` moves trackers that have been done or dropped since
+before a cutoff, with their comments and images, from the tables the issue
+list and detail pages read into ``ArchivedTracker``, ``ArchivedComment`` and
+``ArchivedTrackerImage``, so those tables only grow with active work. Rows
+keep their primary keys and values: links, cached cards and the statistics
+(which go on counting archived trackers) stay as they were.
+
+The done and dropped tabs read both tables, and the tracker page falls back
+to the archive. ``restore_trackers`` moves trackers back, which is what
+reopening one does.
+"""
+
+from django.db import transaction
+
+from .models import (
+    ArchivedComment,
+    ArchivedTracker,
+    ArchivedTrackerImage,
+    Comment,
+    Tracker,
+    TrackerImage,
+    TrackerSearchDocument,
+)
+from .search import index_trackers
+
+BATCH_SIZE = 500
+
+
+def copy_of(obj, model, **values):
+    """An unsaved ``model`` with the field values it shares with ``obj``."""
+    names = {field.attname for field in obj._meta.concrete_fields}
+    for field in model._meta.concrete_fields:
+        if field.attname in names:
+            values.setdefault(field.attname, getattr(obj, field.attname))
+    return model(**values)
+
+
+def insert_copies(model, objects, dates=()):
+    """
+    ``bulk_create`` copies of ``objects`` as ``model``. ``dates`` are the
+    auto_now(_add) fields, which the insert overwrites and which are then put
+    back with a ``bulk_update``.
+    """
+    copies = [copy_of(obj, model) for obj in objects]
+    values = [[getattr(copy, field) for field in dates] for copy in copies]
+    model.objects.bulk_create(copies)
+    if copies and dates:
+        for copy, row in zip(copies, values):
+            for field, value in zip(dates, row):
+                setattr(copy, field, value)
+        model.objects.bulk_update(copies, dates)
+    return copies
+
+
+def raw_delete(queryset):
+    # One DELETE, without collecting rows or sending signals
+    queryset._raw_delete(queryset.db)
+
+
+def archivable(closed_before):
+    return Tracker.objects.filter(
+        status__in=Tracker.CLOSED_STATUSES, closed_at__lt=closed_before
+    ).order_by("pk")
+
+
+def archive_trackers(closed_before, batch_size=BATCH_SIZE):
+    """
+    Archive the trackers closed before ``closed_before``, ``batch_size`` at a
+    time, each batch in its own transaction. Yields the size of each batch.
+    """
+    while True:
+        with transaction.atomic():
+            trackers = list(archivable(closed_before).select_for_update()[:batch_size])
+            if not trackers:
+                return
+            archive_batch(trackers)
+        yield len(trackers)
+
+
+def archive_batch(trackers):
+    pks = [tracker.pk for tracker in trackers]
+    documents = dict(
+        TrackerSearchDocument.objects.filter(tracker__in=pks).values_list(
+            "tracker", "document"
+        )
+    )
+    ArchivedTracker.objects.bulk_create(
+        copy_of(tracker, ArchivedTracker, document=documents.get(tracker.pk, ""))
+        for tracker in trackers
+    )
+    insert_copies(ArchivedTrackerImage, TrackerImage.objects.filter(tracker__in=pks))
+    insert_copies(ArchivedComment, Comment.objects.filter(tracker__in=pks))
+
+    # Without the delete signals: nothing the statistics, cards or search
+    # results show changes, and they would handle the rows one by one.
+    raw_delete(TrackerSearchDocument.objects.filter(tracker__in=pks))
+    raw_delete(Comment.objects.filter(tracker__in=pks))
+    raw_delete(TrackerImage.objects.filter(tracker__in=pks))
+    raw_delete(Tracker.objects.filter(pk__in=pks))
+
+
+def restore_trackers(archived):
+    """
+    Move the archived trackers in the queryset ``archived`` back, with their
+    comments and images. Returns the restored ``Tracker`` objects.
+    """
+    with transaction.atomic():
+        archived = list(archived.select_for_update())
+        if not archived:
+            return []
+        pks = [tracker.pk for tracker in archived]
+        trackers = insert_copies(Tracker, archived, ["date", "updated_at"])
+        insert_copies(
+            TrackerImage,
+            ArchivedTrackerImage.objects.filter(tracker__in=pks),
+            ["upload_at"],
+        )
+        insert_copies(
+            Comment, ArchivedComment.objects.filter(tracker__in=pks), ["created_at"]
+        )
+        index_trackers(trackers)
+        ArchivedTracker.objects.filter(pk__in=pks).delete()
+    return trackers
@@ -0,0 +1,58 @@
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Tracker
+from .signals import trackers_bulk_updated
+from .stats import apply_changes, tracker_states
+
+# action -> Tracker field it sets
+BULK_FIELDS = {
+    "status": "status",
+    "priority": "priority",
+    "assign": "assigned_to",
+}
+
+
+def apply_bulk_action(user, ids, action, value=None):
+    """
+    Apply ``action`` to every tracker in ``ids`` that ``user`` may change,
+    as one UPDATE (or DELETE) inside a transaction.
+
+    Permissions are checked for the whole set in the same query: only the
+    author may change a tracker, as in ``TrackerUpdateView``. Returns the
+    primary keys that were changed.
+    """
+    with transaction.atomic():
+        allowed = Tracker.objects.filter(pk__in=ids, author=user)
+        pks = list(allowed.select_for_update().values_list("pk", flat=True))
+        if not pks:
+            return []
+
+        trackers = Tracker.objects.filter(pk__in=pks)
+        if action == "delete":
+            trackers.delete()  # post_delete updates the statistics
+        else:
+            field = BULK_FIELDS[action]
+            now = timezone.now()
+            # update() skips auto_now and Tracker.save(), so do their part
+            updates = {field: value, "updated_at": now}
+            if field == "status":
+                closed = value in Tracker.CLOSED_STATUSES
+                updates["closed_at"] = (
+                    Coalesce(F("closed_at"), Value(now)) if closed else None
+                )
+
+            before = tracker_states(trackers)
+            trackers.update(**updates)
+            changes = tracker_states(trackers)
+            changes.subtract(before)
+            apply_changes(changes)
+
+            transaction.on_commit(
+                lambda: trackers_bulk_updated.send(
+                    sender=Tracker, pks=pks, fields=[field]
+                )
+            )
+    return pks
@@ -0,0 +1,106 @@
+"""
+Conditional GET for the tracker page and the issue list.
+
+Both answer ``If-None-Match``/``If-Modified-Since`` with 304 Not Modified
+before anything is rendered. The tracker page's validators come from one
+query over the tracker's ``updated_at``, its newest comment and image and
+their counts (``with_counts``); the issue list's from the ``(pk,
+updated_at)`` of the rows on the requested page, or for a search from the
+number of matches and their newest ``updated_at``, which is cheaper than
+ranking them again. Saving or deleting a
+comment or image touches the tracker's ``updated_at`` (``trackers.signals``),
+so the list sees those changes too. The list has no ``Last-Modified``: a
+tracker leaving the page does not make anything on it newer.
+
+ETags also cover what differs between viewers of the same URL: the user,
+the CSRF secret embedded in forms and whether it is an HTMX request. Pages
+with a pending flash message are always rendered.
+"""
+
+import hashlib
+from calendar import timegm
+
+from django.contrib.messages import get_messages
+from django.db.models import Count, Max, Value
+from django.middleware.csrf import get_token
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from .models import Tracker
+from .pagination import keyset_queryset
+
+DETAIL_FIELDS = (
+    "updated_at",
+    "last_comment_at",
+    "last_image_at",
+    "comment_count",
+    "image_count",
+)
+
+
+def make_etag(request, parts):
+    get_token(request)  # forms embed the CSRF secret; make sure there is one
+    parts = [
+        request.user.pk,
+        request.get_full_path(),
+        bool(request.headers.get("HX-Request")),
+        request.META.get("CSRF_COOKIE", ""),
+        *parts,
+    ]
+    return quote_etag(hashlib.md5(repr(parts).encode()).hexdigest())
+
+
+def detail_version(pk):
+    """The values the tracker page's validators are made of, as a query."""
+    return Tracker.objects.filter(pk=pk).with_counts().values(*DETAIL_FIELDS)
+
+
+def detail_validators(request, version):
+    """``(etag, last_modified)`` for ``detail_version``'s row (None: no tracker)."""
+    if version is None:
+        return None, None
+    times = [version[field] for field in DETAIL_FIELDS[:3] if version[field]]
+    parts = [version[field] for field in DETAIL_FIELDS]
+    return make_etag(request, parts), max(times)
+
+
+def list_version(queryset, cursor, page_size, **keyset):
+    """``(pk, updated_at)`` of the rows on one page of the issue list, as a query."""
+    queryset = keyset_queryset(queryset, cursor, **keyset)
+    return queryset.values_list("pk", "updated_at")[: page_size + 1]
+
+
+def search_version(queryset):
+    """``(count, newest updated_at)`` of the matches of a search, as a query."""
+    return (
+        queryset.order_by()
+        .values(version=Value(1))  # one group: the whole queryset
+        .annotate(count=Count("pk"), latest=Max("updated_at"))
+        .values_list("count", "latest")
+    )
+
+
+def list_validators(request, rows):
+    return make_etag(request, list(rows)), None
+
+
+def not_modified(request, etag, last_modified):
+    """A 304 response if the client's copy is still current, else None."""
+    if etag is None or get_messages(request):
+        return None
+    timestamp = timegm(last_modified.utctimetuple()) if last_modified else None
+    response = get_conditional_response(request, etag, timestamp)
+    return add_validators(response, etag, last_modified) if response else None
+
+
+def add_validators(response, etag, last_modified):
+    if etag is None:
+        return response
+    response.headers.setdefault("ETag", etag)
+    if last_modified:
+        timestamp = timegm(last_modified.utctimetuple())
+        response.headers.setdefault("Last-Modified", http_date(timestamp))
+    # Stored by the browser, but checked with the server every time
+    response["Cache-Control"] = "private, no-cache"
+    patch_vary_headers(response, ["Cookie", "HX-Request"])
+    return response
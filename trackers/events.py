@@ -0,0 +1,69 @@
+"""
+Change notifications for live tracker pages.
+
+Model signals publish small notifications ("tracker 12 has a new comment",
+"tracker 12 changed status") to a broker; the async event endpoint
+subscribes to one tracker and turns each notification into a delta read from
+the database since the client's cursor. Notifications carry no data of their
+own, so a missed one only delays an update until the next.
+
+``TRACKERS_EVENT_BROKER`` is the dotted path of the broker class. The default
+``InProcessBroker`` only reaches subscribers in the same process; a broker
+backed by e.g. Redis pub/sub can implement the same two methods.
+"""
+
+import asyncio
+import threading
+from contextlib import asynccontextmanager
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class InProcessBroker:
+    """Fan out notifications to asyncio queues in this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}
+
+    def publish(self, tracker_pk, event):
+        """Deliver ``event`` to every subscriber of ``tracker_pk``; thread-safe."""
+        with self._lock:
+            subscribers = list(self._subscribers.get(tracker_pk, ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, event)
+            except RuntimeError:  # the subscriber's loop has closed
+                pass
+
+    @asynccontextmanager
+    async def subscribe(self, tracker_pk):
+        """Yield an ``asyncio.Queue`` receiving the tracker's events."""
+        subscriber = (asyncio.get_running_loop(), asyncio.Queue())
+        with self._lock:
+            self._subscribers.setdefault(tracker_pk, set()).add(subscriber)
+        try:
+            yield subscriber[1]
+        finally:
+            with self._lock:
+                subscribers = self._subscribers.get(tracker_pk, set())
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    self._subscribers.pop(tracker_pk, None)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            _broker = import_string(settings.TRACKERS_EVENT_BROKER)()
+    return _broker
+
+
+def publish(tracker_pk, event_type):
+    get_broker().publish(tracker_pk, {"type": event_type, "tracker": tracker_pk})
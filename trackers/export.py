@@ -0,0 +1,143 @@
+"""
+Streaming exports of trackers with their comments.
+
+``export_chunks`` turns a queryset into CSV or JSON Lines text one tracker at
+a time: trackers are read with ``.iterator(chunk_size=...)`` and comments
+prefetched per chunk, so memory use depends on the chunk size, not on the
+number of trackers exported. Done and dropped exports include archived
+trackers, after the current ones. ``gzip_chunks`` compresses the stream as it
+goes, and ``aiter_chunks`` serves the stream under ASGI. Records use the
+field names ``import_trackers`` reads, so an export can be imported again.
+"""
+
+import csv
+import json
+import zlib
+from itertools import chain, islice
+
+from asgiref.sync import sync_to_async
+from django.db.models import Prefetch
+
+from .models import ArchivedTracker, Tracker
+
+FORMATS = {
+    # format: content type
+    "csv": "text/csv",
+    "jsonl": "application/x-ndjson",
+}
+
+FIELDS = [
+    "tracker_id",
+    "title",
+    "body",
+    "status",
+    "priority",
+    "author",
+    "assigned_to",
+    "date",
+    "updated_at",
+    "closed_at",
+    "comments",
+]
+
+CHUNK_SIZE = 500
+
+
+def export_queryset(user, params, model=Tracker):
+    """Trackers matching the issue list's ``filter`` and ``q``, in list order."""
+    qs = model.objects.for_filter(user, params.get("filter", "all"))
+    search_query = params.get("q", "")
+    if search_query:
+        qs = qs.ranked_search(search_query).order_by("-search_rank", "-pk")
+    else:
+        qs = qs.order_by("-date", "-pk")
+    _, comment_model = qs.related_models()
+    comments = comment_model.objects.select_related("author").order_by(
+        "created_at", "pk"
+    )
+    return qs.select_related("author", "assigned_to").prefetch_related(
+        Prefetch("comment_set", queryset=comments)
+    )
+
+
+def export_querysets(user, params):
+    """``export_queryset`` and, for done and dropped, its archived counterpart."""
+    querysets = [export_queryset(user, params)]
+    if params.get("filter") in ("done", "dropped"):
+        querysets.append(export_queryset(user, params, ArchivedTracker))
+    return querysets
+
+
+def isoformat(value):
+    return value.isoformat() if value else None
+
+
+def tracker_record(tracker):
+    return {
+        "tracker_id": tracker.tracker_id,
+        "title": tracker.title,
+        "body": tracker.body,
+        "status": tracker.status,
+        "priority": tracker.priority,
+        "author": tracker.author.username,
+        "assigned_to": tracker.assigned_to and tracker.assigned_to.username,
+        "date": isoformat(tracker.date),
+        "updated_at": isoformat(tracker.updated_at),
+        "closed_at": isoformat(tracker.closed_at),
+        "comments": [
+            {
+                "author": comment.author.username,
+                "body": comment.body,
+                "created_at": isoformat(comment.created_at),
+            }
+            for comment in tracker.comment_set.all()
+        ],
+    }
+
+
+class Echo:
+    """A file-like object handing back what ``csv.writer`` writes to it."""
+
+    def write(self, value):
+        return value
+
+
+def export_chunks(querysets, export_format, chunk_size=CHUNK_SIZE):
+    """Yield the export of each of ``querysets`` as text, one tracker per item."""
+    trackers = chain.from_iterable(
+        queryset.iterator(chunk_size=chunk_size) for queryset in querysets
+    )
+    records = map(tracker_record, trackers)
+    if export_format == "jsonl":
+        for record in records:
+            yield json.dumps(record) + "\n"
+        return
+
+    writer = csv.DictWriter(Echo(), FIELDS)
+    yield writer.writeheader()
+    for record in records:
+        record["comments"] = json.dumps(record["comments"])
+        yield writer.writerow(record)
+
+
+def gzip_chunks(chunks, level=6):
+    """Gzip a stream of text chunks, yielding compressed bytes as they fill up."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # 31: gzip header
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode())
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+async def aiter_chunks(chunks, batch=100):
+    """
+    Serve a sync stream from an async response: ``batch`` items at a time are
+    read in the sync thread, instead of Django reading the whole stream into
+    memory first.
+    """
+    iterator = iter(chunks)
+    next_batch = sync_to_async(lambda: list(islice(iterator, batch)))
+    while items := await next_batch():
+        for item in items:
+            yield item
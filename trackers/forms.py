@@ -1,9 +1,22 @@
 from django import forms
+from django.contrib.auth import get_user_model
 from django.forms import modelformset_factory
+
+from accounts.autocomplete import UserAutocompleteWidget
 from .models import Comment, Tracker, TrackerImage
+from .uploads import process_image
+
 
+class ImageUploadMixin:
+    def clean_image(self):
+        image = self.cleaned_data.get("image")
+        # Only new uploads need checking, not the file already stored
+        if image and not getattr(image, "_committed", False):
+            image = process_image(image)
+        return image
 
-class CommentForm(forms.ModelForm):
+
+class CommentForm(ImageUploadMixin, forms.ModelForm):
     class Meta:
         model = Comment
         fields = ("body", "image")
@@ -13,9 +26,17 @@ class TrackerForm(forms.ModelForm):
     class Meta:
         model = Tracker
         fields = ["title", "body", "priority", "assigned_to"]
+        widgets = {"assigned_to": UserAutocompleteWidget}
+
 
+class TrackerEditForm(forms.ModelForm):
+    class Meta:
+        model = Tracker
+        fields = ["body", "priority", "status", "assigned_to"]
+        widgets = {"assigned_to": UserAutocompleteWidget}
 
-class TrackerImageForm(forms.ModelForm):
+
+class TrackerImageForm(ImageUploadMixin, forms.ModelForm):
     class Meta:
         model = TrackerImage
         fields = ["image"]
@@ -28,3 +49,48 @@ TrackerImageFormSet = modelformset_factory(
     extra=3,  # show 3 empty image fields by default
     can_delete=True,  # allow user to remove images
 )
+
+
+class IdListField(forms.Field):
+    widget = forms.MultipleHiddenInput
+
+    def to_python(self, value):
+        try:
+            return [int(pk) for pk in value or []]
+        except (TypeError, ValueError):
+            raise forms.ValidationError("Invalid tracker selection.")
+
+
+class BulkTrackerActionForm(forms.Form):
+    ACTION_CHOICES = [
+        ("status", "Change status"),
+        ("priority", "Change priority"),
+        ("assign", "Assign to"),
+        ("delete", "Delete"),
+    ]
+
+    ids = IdListField(error_messages={"required": "Select at least one tracker."})
+    action = forms.ChoiceField(choices=ACTION_CHOICES)
+    status = forms.ChoiceField(choices=Tracker.STATUS_CHOICES, required=False)
+    priority = forms.ChoiceField(choices=Tracker.PRIORITY_CHOICES, required=False)
+    assigned_to = forms.ModelChoiceField(
+        queryset=get_user_model().objects.all(),
+        required=False,
+        empty_label="Unassigned",
+        widget=UserAutocompleteWidget(attrs={"class": "form-control form-control-sm"}),
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        field = {"status": "status", "priority": "priority"}.get(
+            cleaned_data.get("action")
+        )
+        if field and not cleaned_data.get(field):
+            self.add_error(field, "Choose a value for this action.")
+        return cleaned_data
+
+    def value(self):
+        """The new value for the chosen action (None for delete/unassign)."""
+        action = self.cleaned_data["action"]
+        field = "assigned_to" if action == "assign" else action
+        return self.cleaned_data.get(field)
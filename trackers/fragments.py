@@ -0,0 +1,80 @@
+"""
+Cached HTML of the tracker cards on the issue list.
+
+Each card body is stored under a stable per-tracker key together with the
+version it was rendered from (``card_version``). A cached body is only used
+while its version still matches the tracker about to be shown, and the
+signals in ``trackers.signals`` delete the key whenever the tracker, its
+comments or its images change. Anything that depends on the viewing user is
+rendered outside the cached part.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+CARD_TEMPLATE = "trackers/partials/tracker_card_body.html"
+
+
+def card_key(pk):
+    return f"tracker-card:{pk}"
+
+
+def card_version(tracker):
+    """
+    What the card body is rendered from: the tracker's own timestamp plus the
+    newest comment/image and their counts (so deletes are noticed too).
+    Expects a tracker from ``Tracker.objects.for_list()``.
+    """
+    parts = [
+        tracker.updated_at,
+        tracker.last_comment_at,
+        tracker.last_image_at,
+        tracker.comment_count,
+        tracker.image_count,
+        sum(image.renditions_ready for image in tracker.preview_images),
+    ]
+    return ":".join(str(part) for part in parts)
+
+
+def render_stale_cards(trackers, cached):
+    """
+    Pair each tracker with its card body, rendering those whose cached version
+    is missing or stale. Returns the cards and the newly rendered cache entries.
+    """
+    cards = []
+    rendered = {}
+    for tracker in trackers:
+        key = card_key(tracker.pk)
+        version = card_version(tracker)
+        cached_version, html = cached.get(key, (None, None))
+        if cached_version != version:
+            html = render_to_string(CARD_TEMPLATE, {"bug": tracker})
+            rendered[key] = (version, html)
+        cards.append({"tracker": tracker, "html": mark_safe(html)})
+    return cards, rendered
+
+
+def render_tracker_cards(trackers):
+    """Return ``[{"tracker": ..., "html": ...}]``, rendering only stale cards."""
+    trackers = list(trackers)
+    cached = cache.get_many([card_key(tracker.pk) for tracker in trackers])
+    cards, rendered = render_stale_cards(trackers, cached)
+    if rendered:
+        cache.set_many(rendered, settings.TRACKERS_CARD_CACHE_TIMEOUT)
+    return cards
+
+
+async def arender_tracker_cards(trackers):
+    """Async version of ``render_tracker_cards``."""
+    trackers = list(trackers)
+    cached = await cache.aget_many([card_key(tracker.pk) for tracker in trackers])
+    cards, rendered = render_stale_cards(trackers, cached)
+    if rendered:
+        await cache.aset_many(rendered, settings.TRACKERS_CARD_CACHE_TIMEOUT)
+    return cards
+
+
+def invalidate_tracker_cards(pks):
+    cache.delete_many([card_key(pk) for pk in pks])
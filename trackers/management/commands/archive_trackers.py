@@ -0,0 +1,48 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from trackers.archive import BATCH_SIZE, archivable, archive_trackers
+
+
+class Command(BaseCommand):
+    help = (
+        "Move trackers done or dropped more than --days days ago, with their "
+        "comments and images, to the archive tables. The done and dropped "
+        "tabs still list them and reopening one moves it back. Each batch of "
+        "--batch-size trackers is moved in its own transaction."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days", type=int, default=settings.TRACKERS_ARCHIVE_AFTER_DAYS
+        )
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only count the trackers that would be archived.",
+        )
+
+    def handle(self, *args, days, batch_size, dry_run, **options):
+        closed_before = timezone.now() - timedelta(days=days)
+        if dry_run:
+            count = archivable(closed_before).count()
+            self.stdout.write(f"{count} trackers would be archived.")
+            return
+
+        archived = 0
+        start = time.perf_counter()
+        for moved in archive_trackers(closed_before, batch_size):
+            archived += moved
+            self.stdout.write(f"{archived} trackers archived")
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Archived {archived} trackers closed more than {days} days ago "
+                f"in {elapsed:.1f}s."
+            )
+        )
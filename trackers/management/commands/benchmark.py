@@ -0,0 +1,267 @@
+import json
+import platform
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from io import BytesIO
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from trackers.models import Comment, Tracker, TrackerImage
+from trackers.pagination import encode_cursor
+
+from .loadtest import percentile
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the main tracker pages through the test client and write a JSON "
+        "report of latency percentiles, query counts and peak memory per "
+        "scenario. Writes are rolled back afterwards. Compare two reports "
+        "with --compare."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=50)
+        parser.add_argument("--warmup", type=int, default=3)
+        parser.add_argument(
+            "--user", help="Username to log in as (default: the busiest author)."
+        )
+        parser.add_argument("--output", help="Write the report to this file.")
+        parser.add_argument(
+            "--compare", help="Print the change against an earlier report."
+        )
+        parser.add_argument("--only", action="append", help="Run only these scenarios.")
+
+    def handle(self, *args, **options):
+        user = self.get_user(options["user"])
+        client = Client()
+        client.force_login(user)
+
+        scenarios = self.scenarios(user)
+        if options["only"]:
+            unknown = set(options["only"]) - set(scenarios)
+            if unknown:
+                raise CommandError(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+            scenarios = {name: scenarios[name] for name in options["only"]}
+
+        results = {}
+        media_root = tempfile.mkdtemp()
+        try:
+            # Uploads go to a scratch directory and every row is rolled back.
+            # The test client sends Host: testserver, which production
+            # ALLOWED_HOSTS reject with a 400.
+            with override_settings(
+                MEDIA_ROOT=media_root,
+                ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"],
+            ), transaction.atomic():
+                for name, request in scenarios.items():
+                    results[name] = self.measure(client, request, options)
+                    self.stdout.write(
+                        f"{name:<24} p50 {results[name]['p50_ms']:>8} ms  "
+                        f"p99 {results[name]['p99_ms']:>8} ms  "
+                        f"{results[name]['queries']:>3} queries"
+                    )
+                raise Rollback
+        except Rollback:
+            pass
+        finally:
+            shutil.rmtree(media_root, ignore_errors=True)
+
+        report = {
+            "meta": self.metadata(options),
+            "dataset": self.dataset(),
+            "scenarios": results,
+        }
+        if options["output"]:
+            with open(options["output"], "w") as fh:
+                json.dump(report, fh, indent=2, sort_keys=True)
+                fh.write("\n")
+            self.stdout.write(f"Wrote {options['output']}")
+        if options["compare"]:
+            with open(options["compare"]) as fh:
+                self.compare(json.load(fh), report)
+
+    def get_user(self, username):
+        User = get_user_model()
+        if username:
+            user = User.objects.filter(username=username).first()
+        else:
+            busiest = (
+                Tracker.objects.values("author")
+                .order_by()
+                .annotate(n=Count("pk"))
+                .order_by("-n")
+                .first()
+            )
+            user = busiest and User.objects.get(pk=busiest["author"])
+        if user is None:
+            raise CommandError("No user to log in as; run seed_trackers first.")
+        return user
+
+    def scenarios(self, user):
+        """name -> callable(client) performing one request."""
+        # The tracker with the most comments is the worst case for the detail page
+        tracker = (
+            Tracker.objects.with_counts().order_by("-comment_count", "-pk").first()
+        )
+        if tracker is None:
+            raise CommandError("No trackers to benchmark; run seed_trackers first.")
+        word = tracker.title.split()[0]
+        all_issues = reverse("all_issues")
+        counter = iter(range(10**9))
+
+        def get(path, headers=None):
+            return lambda client: client.get(path, headers=headers)
+
+        def new_comment(client):
+            return client.post(
+                reverse("add_comment", kwargs={"pk": tracker.pk}),
+                {"body": f"Benchmark comment {next(counter)}"},
+            )
+
+        def new_tracker(client):
+            return client.post(
+                reverse("tracker_new"),
+                {
+                    "title": f"Benchmark tracker {next(counter)}",
+                    "body": "Created by the benchmark",
+                    "priority": "normal",
+                    "form-TOTAL_FORMS": "1",
+                    "form-INITIAL_FORMS": "0",
+                    "form-0-image": sample_upload(),
+                },
+            )
+
+        scenarios = {
+            f"all_issues:{filter_type}": get(f"{all_issues}?filter={filter_type}")
+            for filter_type in ("all", "my", "done", "dropped")
+        }
+        scenarios["all_issues:search"] = get(f"{all_issues}?q={word}")
+        scenarios["all_issues:next_page"] = get(
+            f"{all_issues}?filter=all&cursor={self.second_page_cursor(user)}",
+            headers={"HX-Request": "true"},
+        )
+        scenarios["tracker_detail"] = get(tracker.get_absolute_url())
+        scenarios["add_comment"] = new_comment
+        scenarios["tracker_new"] = new_tracker
+        scenarios["profile"] = get(reverse("profile", kwargs={"pk": user.pk}))
+        return scenarios
+
+    def second_page_cursor(self, user):
+        trackers = Tracker.objects.for_filter(user, "all").order_by("-date", "-pk")
+        size = settings.TRACKERS_PAGE_SIZE
+        last = trackers[size - 1 : size].first()
+        return encode_cursor(last) if last else ""
+
+    def measure(self, client, request, options):
+        for _ in range(options["warmup"]):
+            self.check_response(request(client))
+
+        timings = []
+        for _ in range(options["iterations"]):
+            start = time.perf_counter()
+            response = request(client)
+            timings.append(time.perf_counter() - start)
+            self.check_response(response)
+
+        # Queries and memory from one more request, so that tracing does not
+        # slow down the timed ones.
+        tracemalloc.start()
+        with CaptureQueriesContext(connection) as queries:
+            self.check_response(request(client))
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        return {
+            "iterations": len(timings),
+            "mean_ms": round(statistics.mean(timings) * 1000, 2),
+            "p50_ms": round(percentile(timings, 50) * 1000, 2),
+            "p90_ms": round(percentile(timings, 90) * 1000, 2),
+            "p99_ms": round(percentile(timings, 99) * 1000, 2),
+            "max_ms": round(max(timings) * 1000, 2),
+            "queries": len(queries),
+            "peak_memory_kb": round(peak / 1024),
+        }
+
+    def check_response(self, response):
+        if response.status_code not in (200, 302):
+            raise CommandError(
+                f"{response.request['PATH_INFO']} returned {response.status_code}"
+            )
+
+    def metadata(self, options):
+        try:
+            commit = subprocess.run(
+                ["git", "rev-parse", "--short", "HEAD"],
+                capture_output=True,
+                text=True,
+                cwd=settings.BASE_DIR,
+            ).stdout.strip()
+        except OSError:
+            commit = ""
+        return {
+            "commit": commit,
+            "created": timezone.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": connection.vendor,
+            # Sessions and users are loaded on every request
+            "session_engine": settings.SESSION_ENGINE.rsplit(".", 1)[-1],
+            "auth_backends": settings.AUTHENTICATION_BACKENDS,
+            "iterations": options["iterations"],
+        }
+
+    def dataset(self):
+        return {
+            "users": get_user_model().objects.count(),
+            "trackers": Tracker.objects.count(),
+            "comments": Comment.objects.count(),
+            "images": TrackerImage.objects.count(),
+        }
+
+    def compare(self, before, after):
+        self.stdout.write(
+            f"\nAgainst {before['meta'].get('commit') or 'previous report'}:"
+        )
+        for setting in ("session_engine", "auth_backends"):
+            if before["meta"].get(setting) != after["meta"][setting]:
+                self.stdout.write(
+                    f"  {setting}: {before['meta'].get(setting)} -> "
+                    f"{after['meta'][setting]}"
+                )
+        for name, result in after["scenarios"].items():
+            old = before["scenarios"].get(name)
+            if old is None:
+                self.stdout.write(f"{name:<24} (new)")
+                continue
+            change = (result["p50_ms"] - old["p50_ms"]) / old["p50_ms"] * 100
+            self.stdout.write(
+                f"{name:<24} p50 {old['p50_ms']:>8} -> {result['p50_ms']:>8} ms "
+                f"({change:+.0f}%)  queries {old['queries']} -> {result['queries']}"
+            )
+
+
+def sample_upload():
+    buffer = BytesIO()
+    Image.new("RGB", (800, 600), "white").save(buffer, "JPEG")
+    buffer.name = "benchmark.jpg"
+    buffer.seek(0)
+    return buffer
@@ -0,0 +1,125 @@
+import re
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, router, transaction
+from django.utils import timezone
+
+from trackers.archive import BATCH_SIZE, archivable
+from trackers.models import ArchivedTracker, Tracker
+from trackers.pagination import encode_cursor, keyset_queryset
+from trackers.stats import stats_query
+from trackers.views import issue_list_query, tracker_detail_queryset
+
+# "SCAN trackers_tracker" on SQLite (without "USING ... INDEX"), "Seq Scan on"
+# on PostgreSQL. Scans of FTS virtual tables and temporary b-trees are fine.
+FULL_SCAN_PATTERNS = {
+    "sqlite": re.compile(r"\bSCAN (?!.*\b(?:USING|VIRTUAL TABLE)\b)(\w+)"),
+    "postgresql": re.compile(r"\bSeq Scan on (\w+)"),
+}
+# Scanning the rows of a subquery (e.g. the "qualify" one filtering on a window
+# function) is fine too.
+SUBQUERY_PATTERN = re.compile(r"\bCO-ROUTINE (\w+)")
+
+
+class Command(BaseCommand):
+    help = (
+        "Run EXPLAIN on the queries behind the tracker views and fail if any of "
+        "them needs a full table scan."
+    )
+
+    def hot_queries(self):
+        """
+        The list, search, detail, profile and archive queries, keyed by a
+        readable name. They come from the code the views run, so the plans
+        checked are the plans served.
+        """
+        user = get_user_model()(pk=1, is_staff=False)
+        page_size = settings.TRACKERS_PAGE_SIZE
+        trackers = [1, 2, 3]
+        queries = {}
+
+        def add_list(name, params):
+            querysets, keyset = issue_list_query(user, params)
+            # A later page: the cursor becomes a (date or rank, id) seek
+            row = SimpleNamespace(pk=100, date=timezone.now(), search_rank=1.0)
+            cursor = encode_cursor(row, keyset.get("field", "date"))
+            for queryset in querysets:
+                label = f"{name} {queryset.model._meta.model_name}"
+                queries[label] = keyset_queryset(queryset, "", **keyset)[
+                    : page_size + 1
+                ]
+                queries[f"{label} next page"] = keyset_queryset(
+                    queryset, cursor, **keyset
+                )[: page_size + 1]
+                # What for_list() prefetches for the cards of a page
+                for lookup in queryset._prefetch_related_lookups:
+                    queries[f"{label} prefetch {lookup.prefetch_to}"] = (
+                        lookup.queryset.filter(tracker__in=trackers)
+                    )
+
+        for filter_type in ("all", "my", "done", "dropped"):
+            add_list(f"all_issues filter={filter_type}", {"filter": filter_type})
+            add_list(
+                f"all_issues search filter={filter_type}",
+                {"filter": filter_type, "q": "login"},
+            )
+
+        for model in (Tracker, ArchivedTracker):
+            name = f"detail {model._meta.model_name}"
+            queryset = tracker_detail_queryset(model).filter(pk=1)
+            queries[name] = queryset
+            for lookup in queryset._prefetch_related_lookups:
+                queries[f"{name} prefetch {lookup.prefetch_to}"] = (
+                    lookup.queryset.filter(tracker=1)
+                )
+            comments = model(pk=1).comment_set.select_related("author")
+            queries[f"{name} comments"] = keyset_queryset(
+                comments, "", field="created_at"
+            )[: settings.TRACKERS_COMMENTS_PAGE_SIZE + 1]
+
+        queryset, _ = stats_query(user)
+        queries["profile stats"] = queryset.order_by()
+
+        queries["archive batch"] = archivable(timezone.now())[:BATCH_SIZE]
+        return queries
+
+    def explain(self, queryset, connection):
+        # QuerySet.explain() puts EXPLAIN inside the subquery that filters on
+        # a window function (the prefetches), so run it on the SQL instead.
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f"{connection.ops.explain_query_prefix()} {sql}", params)
+            return "\n".join(str(row[-1]) for row in cursor.fetchall())
+
+    def handle(self, *args, **options):
+        using = router.db_for_read(Tracker)
+        connection = connections[using]
+        pattern = FULL_SCAN_PATTERNS.get(connection.vendor)
+        if pattern is None:
+            raise CommandError(
+                f"Don't know how to read {connection.vendor} query plans."
+            )
+
+        failures = []
+        with transaction.atomic(using=using):
+            if connection.vendor == "postgresql":
+                # Small development tables are always cheaper to scan; make
+                # the planner show whether an index *could* be used.
+                with connection.cursor() as cursor:
+                    cursor.execute("SET LOCAL enable_seqscan = off")
+
+            for name, queryset in self.hot_queries().items():
+                plan = self.explain(queryset, connection)
+                scans = set(pattern.findall(plan)) - set(SUBQUERY_PATTERN.findall(plan))
+                if options["verbosity"] > 1:
+                    self.stdout.write(f"-- {name}\n{plan}\n")
+                if scans:
+                    failures.append(f"{name}: full scan of {', '.join(sorted(scans))}")
+
+        if failures:
+            raise CommandError("Full table scans found:\n  " + "\n  ".join(failures))
+
+        self.stdout.write(self.style.SUCCESS("No full table scans found."))
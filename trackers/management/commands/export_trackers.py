@@ -0,0 +1,82 @@
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from plain_tracker.replicas import reading_from_replica
+from trackers.export import (
+    CHUNK_SIZE,
+    FORMATS,
+    export_chunks,
+    export_querysets,
+    gzip_chunks,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Export trackers with their comments as CSV or JSON Lines, streamed "
+        "in chunks so memory use does not grow with the export. --filter and "
+        "-q select trackers like the issue list does."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=list(FORMATS), default="csv")
+        parser.add_argument(
+            "--filter", choices=["all", "my", "done", "dropped"], default="all"
+        )
+        parser.add_argument("-q", "--query", default="", help="Search query.")
+        parser.add_argument(
+            "--user",
+            help="Export as this user (required for --filter=my; without it, "
+            "done and dropped include everyone's trackers).",
+        )
+        parser.add_argument(
+            "--output", default="-", help="File to write, or - for stdout."
+        )
+        parser.add_argument(
+            "--gzip",
+            action="store_true",
+            help="Compress the output (implied by an --output ending in .gz).",
+        )
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        # An export is a report: read it from a replica when there is one
+        with reading_from_replica():
+            self.export(options)
+
+    def export(self, options):
+        User = get_user_model()
+        if options["user"]:
+            user = User.objects.filter(username=options["user"]).first()
+            if user is None:
+                raise CommandError(f"No user named {options['user']!r}.")
+        elif options["filter"] == "my":
+            raise CommandError("--filter=my needs --user.")
+        else:
+            user = User(is_staff=True)
+
+        querysets = export_querysets(
+            user, {"filter": options["filter"], "q": options["query"]}
+        )
+        chunks = export_chunks(querysets, options["format"], options["chunk_size"])
+
+        output = options["output"]
+        if options["gzip"] or output.endswith(".gz"):
+            chunks = gzip_chunks(chunks)
+            if output == "-":
+                self.write_all(sys.stdout.buffer, chunks)
+            else:
+                with open(output, "wb") as fh:
+                    self.write_all(fh, chunks)
+        elif output == "-":
+            for chunk in chunks:
+                self.stdout.write(chunk, ending="")
+        else:
+            with open(output, "w", newline="", encoding="utf-8") as fh:
+                self.write_all(fh, chunks)
+
+    def write_all(self, fh, chunks):
+        for chunk in chunks:
+            fh.write(chunk)
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from trackers.models import Comment, TrackerImage
+from trackers.thumbnails import process
+
+
+class Command(BaseCommand):
+    help = "Generate missing image renditions for tracker and comment images."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all", action="store_true", help="Regenerate existing renditions too."
+        )
+
+    def handle(self, *args, **options):
+        querysets = [
+            TrackerImage.objects.all(),
+            Comment.objects.exclude(image="").exclude(image__isnull=True),
+        ]
+        total = 0
+        for queryset in querysets:
+            if not options["all"]:
+                queryset = queryset.filter(renditions_ready=False)
+            label = queryset.model._meta.label
+            for pk in queryset.values_list("pk", flat=True).iterator():
+                process(label, pk)
+                total += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Processed {total} images."))
@@ -0,0 +1,283 @@
+import csv
+import json
+import os
+import sys
+import time
+from collections import Counter
+from datetime import datetime
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from trackers.models import Comment, Tracker, TrackerSequence
+from trackers.search import index_trackers
+from trackers.stats import STATE_FIELDS, apply_changes, tracker_state
+
+STATUSES = dict(Tracker.STATUS_CHOICES)
+# Fields that must be strings when present
+TEXT_FIELDS = ("title", "body", "author", "assigned_to", "status", "priority")
+COMMENT_TEXT_FIELDS = ("author", "body")
+PRIORITIES = dict(Tracker.PRIORITY_CHOICES)
+
+
+class Command(BaseCommand):
+    help = (
+        "Import trackers (and their comments) from CSV or JSON Lines.\n\n"
+        "Each record has title, body, author (username) and optionally "
+        "assigned_to, status, priority, date, updated_at, closed_at and "
+        "comments: a list of {author, body, created_at} (a JSON string in "
+        "CSV). Records are written in batches of --batch-size, each in its "
+        "own transaction; progress is saved to a checkpoint file after every "
+        "batch so a failed import can continue with --resume."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="File to import, or - for stdin.")
+        parser.add_argument(
+            "--format",
+            choices=["csv", "jsonl"],
+            help="Input format (default: from the file extension).",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--checkpoint", help="Checkpoint file (default: <path>.checkpoint)."
+        )
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            help="Skip the records a previous run already imported.",
+        )
+
+    def handle(self, *args, path, batch_size, **options):
+        input_format = options["format"] or (
+            "csv" if path.lower().endswith(".csv") else "jsonl"
+        )
+        checkpoint = options["checkpoint"] or (
+            None if path == "-" else f"{path}.checkpoint"
+        )
+        done = self.read_checkpoint(checkpoint, path) if options["resume"] else 0
+
+        self.users = {}
+        self.imported = self.comments = self.skipped = 0
+        start = time.perf_counter()
+
+        fh = sys.stdin if path == "-" else open(path, newline="", encoding="utf-8")
+        try:
+            records = islice(self.read_records(fh, input_format), done, None)
+            while batch := list(islice(records, batch_size)):
+                self.import_batch(batch)
+                done += len(batch)
+                self.write_checkpoint(checkpoint, path, done)
+                rate = self.imported / (time.perf_counter() - start)
+                self.stdout.write(
+                    f"{done} records read, {self.imported} trackers imported "
+                    f"({rate:.0f}/s)"
+                )
+        finally:
+            if fh is not sys.stdin:
+                fh.close()
+
+        if checkpoint and os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {self.imported} trackers and {self.comments} comments "
+                f"in {elapsed:.1f}s; skipped {self.skipped} records."
+            )
+        )
+
+    # ----------------------------
+    # Input
+    # ----------------------------
+    def read_records(self, fh, input_format):
+        """
+        Yield ``(line number, raw record)``: a CSV row or a JSON Lines line,
+        decoded by ``decode_record`` so a bad one is skipped, not fatal.
+        """
+        if input_format == "csv":
+            reader = csv.DictReader(fh)
+            for row in reader:
+                yield reader.line_num, row
+        else:
+            for number, line in enumerate(fh, 1):
+                if line.strip():
+                    yield number, line
+
+    def decode_record(self, raw):
+        try:
+            if isinstance(raw, str):
+                record = json.loads(raw)
+            else:
+                record = raw
+                record["comments"] = json.loads(raw.get("comments") or "[]")
+        except json.JSONDecodeError as exc:
+            raise ValueError(f"invalid JSON: {exc}") from exc
+        if not isinstance(record, dict):
+            raise ValueError("not a JSON object")
+        comments = record.get("comments") or []
+        if not isinstance(comments, list) or not all(
+            isinstance(comment, dict) for comment in comments
+        ):
+            raise ValueError("comments must be a list of objects")
+        # Checked before resolve_users and build_tracker use them
+        self.check_text(record, TEXT_FIELDS)
+        for comment in comments:
+            self.check_text(comment, COMMENT_TEXT_FIELDS, "comment ")
+        return record
+
+    def check_text(self, record, fields, prefix=""):
+        for field in fields:
+            value = record.get(field)
+            if value is not None and not isinstance(value, str):
+                raise ValueError(f"{prefix}{field} must be a string, not {value!r}")
+
+    def read_checkpoint(self, checkpoint, path):
+        if not checkpoint or not os.path.exists(checkpoint):
+            raise CommandError("Nothing to resume: no checkpoint file found.")
+        with open(checkpoint) as fh:
+            data = json.load(fh)
+        # A checkpoint left by another file would skip the wrong records
+        if os.path.abspath(data.get("path") or "") != os.path.abspath(path):
+            raise CommandError(
+                f"{checkpoint} is for {data.get('path')!r}, not {path!r}; "
+                "remove it or pass --checkpoint."
+            )
+        return data["records"]
+
+    def write_checkpoint(self, checkpoint, path, records):
+        if not checkpoint:
+            return
+        with open(f"{checkpoint}.tmp", "w") as fh:
+            json.dump({"path": path, "records": records}, fh)
+        os.replace(f"{checkpoint}.tmp", checkpoint)
+
+    def resolve_users(self, records):
+        """Fill the username -> user id cache with the users of a batch."""
+        names = set()
+        for record in records:
+            names.add(record.get("author"))
+            names.add(record.get("assigned_to"))
+            names.update(c.get("author") for c in record.get("comments") or ())
+        missing = {name for name in names if name} - self.users.keys()
+        if missing:
+            users = get_user_model().objects.filter(username__in=missing)
+            self.users.update(users.values_list("username", "pk"))
+
+    def parse_date(self, value, default):
+        if not value:
+            return default
+        parsed = parse_datetime(value) if isinstance(value, str) else value
+        if not isinstance(parsed, datetime):
+            raise ValueError(f"invalid date {value!r}")
+        if timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed)
+        return parsed
+
+    # ----------------------------
+    # Output
+    # ----------------------------
+    def build_tracker(self, record, now):
+        author = self.users.get(record.get("author"))
+        if author is None:
+            raise ValueError(f"unknown author {record.get('author')!r}")
+        status = record.get("status") or "in_progress"
+        priority = record.get("priority") or "normal"
+        if status not in STATUSES or priority not in PRIORITIES:
+            raise ValueError(f"invalid status/priority {status!r}/{priority!r}")
+        if not record.get("title"):
+            raise ValueError("missing title")
+
+        date = self.parse_date(record.get("date"), now)
+        updated_at = self.parse_date(record.get("updated_at"), date)
+        closed_at = None
+        if status in Tracker.CLOSED_STATUSES:
+            closed_at = self.parse_date(record.get("closed_at"), updated_at)
+        return Tracker(
+            author_id=author,
+            # Unknown assignees are left unassigned
+            assigned_to_id=self.users.get(record.get("assigned_to")),
+            title=record["title"][:255],
+            body=record.get("body") or "",
+            status=status,
+            priority=priority,
+            date=date,
+            updated_at=updated_at,
+            closed_at=closed_at,
+        )
+
+    def build_comments(self, record, tracker):
+        return [
+            Comment(
+                tracker=tracker,
+                # Unknown authors become the tracker's author
+                author_id=self.users.get(comment.get("author"), tracker.author_id),
+                body=comment.get("body") or "",
+                created_at=self.parse_date(comment.get("created_at"), tracker.date),
+            )
+            for comment in record.get("comments") or ()
+        ]
+
+    def skip(self, line, exc):
+        self.skipped += 1
+        self.stderr.write(f"Skipped line {line}: {exc}")
+
+    def import_batch(self, batch):
+        records = []
+        for line, raw in batch:
+            try:
+                records.append((line, self.decode_record(raw)))
+            except ValueError as exc:
+                self.skip(line, exc)
+        self.resolve_users(record for _, record in records)
+        now = timezone.now()
+
+        # Everything is parsed and checked before the batch's transaction, so
+        # a bad record is skipped instead of rolling back the whole batch.
+        trackers, comments = [], []
+        for line, record in records:
+            try:
+                tracker = self.build_tracker(record, now)
+                comments.extend(self.build_comments(record, tracker))
+            except ValueError as exc:
+                self.skip(line, exc)
+                continue
+            trackers.append(tracker)
+        if not trackers:
+            return
+
+        with transaction.atomic():
+            # One UPDATE for the whole batch instead of one per tracker; a
+            # rolled back batch gives its numbers back.
+            numbers = TrackerSequence.allocate(len(trackers))
+            for tracker, number in zip(trackers, numbers):
+                tracker.tracker_id = Tracker.format_tracker_id(number)
+
+            # auto_now_add/auto_now overwrite the dates on insert
+            dates = [(t.date, t.updated_at) for t in trackers]
+            Tracker.objects.bulk_create(trackers)
+            for tracker, (date, updated_at) in zip(trackers, dates):
+                tracker.date, tracker.updated_at = date, updated_at
+            Tracker.objects.bulk_update(trackers, ["date", "updated_at"])
+
+            created_at = [comment.created_at for comment in comments]
+            Comment.objects.bulk_create(comments)
+            for comment, value in zip(comments, created_at):
+                comment.created_at = value
+            Comment.objects.bulk_update(comments, ["created_at"])
+
+            # bulk_create skips the signals that keep these up to date
+            index_trackers(trackers)
+            apply_changes(
+                Counter(
+                    tracker_state({f: getattr(t, f) for f in STATE_FIELDS})
+                    for t in trackers
+                )
+            )
+
+        self.imported += len(trackers)
+        self.comments += len(comments)
@@ -0,0 +1,190 @@
+import asyncio
+import json
+import math
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import AsyncClient, Client, override_settings
+from django.urls import reverse
+
+from trackers.models import Tracker
+
+MODES = {
+    # mode: value of TRACKERS_ASYNC_VIEWS it is meant to run with
+    "wsgi": False,
+    "asgi": True,
+}
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of ``values`` (which must not be empty)."""
+    values = sorted(values)
+    rank = max(math.ceil(pct / 100 * len(values)), 1)
+    return values[rank - 1]
+
+
+def summarize(latencies, elapsed):
+    return {
+        "requests": len(latencies),
+        "throughput": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare throughput and latency of the read-heavy pages served by the "
+        "sync views through Django's WSGI handler and by the async views "
+        "(TRACKERS_ASYNC_VIEWS) through its ASGI handler, on the current "
+        "database. Requests go through the full middleware stack in-process, "
+        "without a web server. Seed data first with seed_trackers."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--mode", choices=[*MODES, "both"], default="both", help="What to run."
+        )
+        parser.add_argument("--requests", type=int, default=500)
+        parser.add_argument(
+            "--concurrency", type=int, default=10, help="Simultaneous clients."
+        )
+        parser.add_argument(
+            "--user", help="Username to log in as (default: the first user)."
+        )
+        parser.add_argument("--json", action="store_true", help="Print JSON only.")
+
+    def handle(self, *args, **options):
+        if options["mode"] == "both":
+            results = {mode: self.run_in_subprocess(mode, options) for mode in MODES}
+        else:
+            results = {options["mode"]: self.run(options["mode"], options)}
+
+        if options["json"]:
+            self.stdout.write(json.dumps(results))
+            return
+
+        columns = ["requests", "throughput", "p50_ms", "p95_ms", "p99_ms"]
+        self.stdout.write("mode  " + "".join(f"{c:>12}" for c in columns))
+        for mode, result in results.items():
+            self.stdout.write(
+                f"{mode:<6}" + "".join(f"{result[c]:>12}" for c in columns)
+            )
+
+    def run_in_subprocess(self, mode, options):
+        # The URLconf picks sync or async views at import, so each mode needs
+        # its own process.
+        command = [
+            sys.executable,
+            sys.argv[0],
+            "loadtest",
+            f"--mode={mode}",
+            f"--requests={options['requests']}",
+            f"--concurrency={options['concurrency']}",
+            "--json",
+        ]
+        if options["user"]:
+            command.append(f"--user={options['user']}")
+        env = {**os.environ, "TRACKERS_ASYNC_VIEWS": str(MODES[mode])}
+        output = subprocess.run(command, env=env, capture_output=True, text=True)
+        if output.returncode:
+            raise CommandError(f"{mode} run failed:\n{output.stderr}")
+        return json.loads(output.stdout)[mode]
+
+    def get_paths(self, user):
+        tracker = Tracker.objects.order_by("-date").first()
+        if tracker is None:
+            raise CommandError("No trackers to load; seed some first.")
+        word = tracker.title.split()[0]
+        all_issues = reverse("all_issues")
+        return [
+            all_issues,
+            f"{all_issues}?filter=my",
+            f"{all_issues}?filter=done",
+            f"{all_issues}?q={word}",
+            tracker.get_absolute_url(),
+            reverse("profile", kwargs={"pk": user.pk}),
+        ]
+
+    def run(self, mode, options):
+        if settings.TRACKERS_ASYNC_VIEWS != MODES[mode]:
+            self.stderr.write(
+                f"Warning: running {mode} with "
+                f"TRACKERS_ASYNC_VIEWS={settings.TRACKERS_ASYNC_VIEWS}."
+            )
+        User = get_user_model()
+        users = User.objects.order_by("pk")
+        if options["user"]:
+            users = users.filter(username=options["user"])
+        user = users.first()
+        if user is None:
+            raise CommandError("No user to log in as.")
+
+        paths = self.get_paths(user)
+        total, concurrency = options["requests"], options["concurrency"]
+        # Request i of worker w is path number (w + i * concurrency)
+        plans = [
+            [paths[n % len(paths)] for n in range(worker, total, concurrency)]
+            for worker in range(concurrency)
+        ]
+
+        # The test clients send Host: testserver, which production
+        # ALLOWED_HOSTS reject with a 400.
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+            start = time.perf_counter()
+            if mode == "wsgi":
+                with ThreadPoolExecutor(concurrency) as executor:
+                    runs = list(
+                        executor.map(lambda plan: self.run_wsgi(user, plan), plans)
+                    )
+            else:
+                runs = asyncio.run(self.run_asgi(user, plans))
+            elapsed = time.perf_counter() - start
+
+        # Timings of error pages say nothing about the real ones
+        failures = [failure for run in runs for failure in run[1]]
+        if failures:
+            raise CommandError(
+                f"{len(failures)} of {total} requests failed, "
+                f"e.g. {', '.join(sorted(set(failures))[:3])}."
+            )
+        latencies = [latency for run in runs for latency in run[0]]
+        return summarize(latencies, elapsed)
+
+    def run_wsgi(self, user, plan):
+        client = Client(raise_request_exception=False)
+        client.force_login(user)
+        latencies, failures = [], []
+        try:
+            for path in plan:
+                start = time.perf_counter()
+                response = client.get(path)
+                latencies.append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    failures.append(f"{path} ({response.status_code})")
+        finally:
+            connections.close_all()
+        return latencies, failures
+
+    async def run_asgi(self, user, plans):
+        async def worker(plan):
+            client = AsyncClient(raise_request_exception=False)
+            await client.aforce_login(user)
+            latencies, failures = [], []
+            for path in plan:
+                start = time.perf_counter()
+                response = await client.get(path)
+                latencies.append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    failures.append(f"{path} ({response.status_code})")
+            return latencies, failures
+
+        return await asyncio.gather(*(worker(plan) for plan in plans))
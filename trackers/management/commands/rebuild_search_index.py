@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from trackers.models import Tracker
+from trackers.search import index_trackers
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search documents of every tracker."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, batch_size, **options):
+        trackers = Tracker.objects.order_by("pk").only(
+            "pk", "tracker_id", "title", "body"
+        )
+        batch = []
+        total = 0
+        for tracker in trackers.iterator(chunk_size=batch_size):
+            batch.append(tracker)
+            if len(batch) == batch_size:
+                index_trackers(batch)
+                total += len(batch)
+                batch = []
+        if batch:
+            index_trackers(batch)
+            total += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(f"Indexed {total} trackers."))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from trackers.stats import rebuild_tracker_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the dashboard statistics tables from the trackers, correcting "
+        "any drift in the incrementally maintained counts."
+    )
+
+    def handle(self, *args, **options):
+        wrong = rebuild_tracker_stats()
+        if wrong:
+            self.stdout.write(self.style.WARNING(f"Corrected {wrong} rows."))
+        else:
+            self.stdout.write(self.style.SUCCESS("Statistics were up to date."))
@@ -0,0 +1,177 @@
+import random
+from datetime import timedelta
+from io import BytesIO
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image
+
+from trackers.models import Comment, Tracker, TrackerImage, TrackerSequence
+from trackers.search import index_trackers
+from trackers.stats import rebuild_tracker_stats
+from trackers.thumbnails import generate_renditions
+
+WORDS = (
+    "login page error crash slow timeout button form upload image search "
+    "report export profile email password session cache database query "
+    "mobile layout sidebar filter comment notification payment invoice api"
+).split()
+
+STATUS_WEIGHTS = {"in_progress": 6, "done": 3, "drop": 1}
+PRIORITY_WEIGHTS = {"low": 3, "normal": 5, "high": 2}
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the database with generated users, trackers, comments and "
+        "images for load and benchmark runs. Rows are inserted with "
+        "bulk_create; images share a few generated files."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=50)
+        parser.add_argument("--trackers", type=int, default=5000)
+        parser.add_argument(
+            "--comments", type=float, default=4, help="Mean comments per tracker."
+        )
+        parser.add_argument(
+            "--images", type=float, default=0.5, help="Mean images per tracker."
+        )
+        parser.add_argument(
+            "--days", type=int, default=365, help="Spread trackers over this many days."
+        )
+        parser.add_argument("--seed", type=int, default=0, help="Random seed.")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        batch_size = options["batch_size"]
+
+        with transaction.atomic():
+            users = self.create_users(options["users"], rng, batch_size)
+            trackers = self.create_trackers(users, options, rng, batch_size)
+            comments = self.create_comments(trackers, users, options, rng, batch_size)
+            images = self.create_images(trackers, options, rng, batch_size)
+            index_trackers(trackers, batch_size)
+            rebuild_tracker_stats()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Created {len(users)} users, {len(trackers)} trackers, "
+                f"{comments} comments and {images} images."
+            )
+        )
+
+    def sentence(self, rng, words):
+        return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+    def create_users(self, count, rng, batch_size):
+        User = get_user_model()
+        start = User.objects.count()
+        password = make_password("seeded-password")
+        users = [
+            User(
+                username=f"seed{start + i}",
+                email=f"seed{start + i}@example.com",
+                password=password,
+            )
+            for i in range(count)
+        ]
+        User.objects.bulk_create(users, batch_size=batch_size)
+        return list(User.objects.filter(username__in=[u.username for u in users]))
+
+    def create_trackers(self, users, options, rng, batch_size):
+        count = options["trackers"]
+        now = timezone.now()
+        span = timedelta(days=options["days"]).total_seconds()
+        numbers = TrackerSequence.allocate(count)
+        # A few users open most trackers
+        weights = [1 / (rank + 1) for rank in range(len(users))]
+
+        trackers = []
+        for number in numbers:
+            date = now - timedelta(seconds=span * rng.random() ** 2)
+            status = rng.choices(*zip(*STATUS_WEIGHTS.items()))[0]
+            closed_at = None
+            if status in Tracker.CLOSED_STATUSES:
+                closed_at = date + (now - date) * rng.random()
+            trackers.append(
+                Tracker(
+                    tracker_id=Tracker.format_tracker_id(number),
+                    author=rng.choices(users, weights)[0],
+                    assigned_to=rng.choice(users) if rng.random() < 0.5 else None,
+                    title=self.sentence(rng, rng.randint(3, 8)),
+                    body=self.sentence(rng, rng.randint(10, 80)),
+                    status=status,
+                    priority=rng.choices(*zip(*PRIORITY_WEIGHTS.items()))[0],
+                    date=date,
+                    updated_at=closed_at or date,
+                    closed_at=closed_at,
+                )
+            )
+        trackers.sort(key=lambda tracker: tracker.date)
+        # auto_now_add/auto_now overwrite the dates on insert; put them back.
+        # closed_at is kept as given.
+        dates = [(tracker.date, tracker.updated_at) for tracker in trackers]
+        Tracker.objects.bulk_create(trackers, batch_size=batch_size)
+        for tracker, (date, updated_at) in zip(trackers, dates):
+            tracker.date, tracker.updated_at = date, updated_at
+        Tracker.objects.bulk_update(
+            trackers, ["date", "updated_at"], batch_size=batch_size
+        )
+        return trackers
+
+    def create_comments(self, trackers, users, options, rng, batch_size):
+        comments = []
+        now = timezone.now()
+        for tracker in trackers:
+            # Long-tailed: most trackers get a few comments, some get many
+            count = int(rng.expovariate(1 / options["comments"]))
+            for _ in range(count):
+                comments.append(
+                    Comment(
+                        tracker=tracker,
+                        author=rng.choice(users),
+                        body=self.sentence(rng, rng.randint(3, 40)),
+                        created_at=tracker.date + (now - tracker.date) * rng.random(),
+                    )
+                )
+        comments.sort(key=lambda comment: comment.created_at)
+        created_at = [comment.created_at for comment in comments]
+        Comment.objects.bulk_create(comments, batch_size=batch_size)
+        for comment, value in zip(comments, created_at):
+            comment.created_at = value
+        Comment.objects.bulk_update(comments, ["created_at"], batch_size=batch_size)
+        return len(comments)
+
+    def create_images(self, trackers, options, rng, batch_size):
+        if not options["images"]:
+            return 0
+        files = [self.sample_image(rng, i) for i in range(5)]
+        images = []
+        for tracker in trackers:
+            count = int(rng.expovariate(1 / options["images"]))
+            images.extend(
+                TrackerImage(
+                    tracker=tracker, image=rng.choice(files), renditions_ready=True
+                )
+                for _ in range(count)
+            )
+        TrackerImage.objects.bulk_create(images, batch_size=batch_size)
+        return len(images)
+
+    def sample_image(self, rng, index):
+        """Save one generated photo-sized JPEG and its renditions."""
+        color = tuple(rng.randrange(256) for _ in range(3))
+        buffer = BytesIO()
+        Image.new("RGB", (1600, 1200), color).save(buffer, "JPEG")
+        name = default_storage.save(
+            f"tracker_images/seed-{index}.jpg", ContentFile(buffer.getvalue())
+        )
+        generate_renditions(TrackerImage(image=name).image)
+        return name
@@ -1,5 +1,5 @@
 # trackers/migrations/0005_auto_20250908_2249.py
-from django.db import migrations, models
+from django.db import migrations
 
 
 class Migration(migrations.Migration):
@@ -8,29 +8,7 @@ class Migration(migrations.Migration):
         ("trackers", "0004_alter_tracker_tracker_id"),
     ]
 
-    operations = [
-        migrations.CreateModel(
-            name="TrackerImage",
-            fields=[
-                (
-                    "id",
-                    models.BigAutoField(
-                        auto_created=True,
-                        primary_key=True,
-                        serialize=False,
-                        verbose_name="ID",
-                    ),
-                ),
-                ("image", models.ImageField(upload_to="tracker_images/")),
-                ("upload_at", models.DateTimeField(auto_now_add=True)),
-                (
-                    "tracker",
-                    models.ForeignKey(
-                        on_delete=models.CASCADE,
-                        related_name="images",
-                        to="trackers.tracker",
-                    ),
-                ),
-            ],
-        ),
-    ]
+    # TrackerImage is already created by 0001_initial (and its related_name set
+    # by 0002), so re-creating it here fails on a fresh database. Kept as a
+    # no-op to preserve the migration graph for databases that applied it.
+    operations = []
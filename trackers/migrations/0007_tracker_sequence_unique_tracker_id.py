@@ -0,0 +1,68 @@
+# Generated by Django 5.2.5 on 2026-10-18 13:40
+
+from django.db import migrations, models
+
+
+def repair_tracker_ids(apps, schema_editor):
+    """
+    Give every tracker a distinct tracker_id before the column becomes unique,
+    then seed the counter past the highest number in use.
+
+    The oldest tracker keeps a duplicated id; later ones (and any without an
+    id) are renumbered after the current maximum.
+    """
+    Tracker = apps.get_model("trackers", "Tracker")
+    TrackerSequence = apps.get_model("trackers", "TrackerSequence")
+    db_alias = schema_editor.connection.alias
+
+    trackers = Tracker.objects.using(db_alias).order_by("date", "pk")
+
+    seen = set()
+    highest = 0
+    for tracker_id in trackers.values_list("tracker_id", flat=True).iterator():
+        if tracker_id and tracker_id[2:].isdigit():
+            highest = max(highest, int(tracker_id[2:]))
+
+    to_renumber = []
+    for tracker in trackers.only("pk", "tracker_id").iterator():
+        if tracker.tracker_id and tracker.tracker_id not in seen:
+            seen.add(tracker.tracker_id)
+            continue
+        highest += 1
+        tracker.tracker_id = f"PT{highest:05d}"
+        to_renumber.append(tracker)
+
+    Tracker.objects.using(db_alias).bulk_update(
+        to_renumber, ["tracker_id"], batch_size=500
+    )
+    TrackerSequence.objects.using(db_alias).update_or_create(
+        name="tracker", defaults={"value": highest}
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("trackers", "0006_alter_tracker_options_comment_image"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TrackerSequence",
+            fields=[
+                (
+                    "name",
+                    models.CharField(max_length=50, primary_key=True, serialize=False),
+                ),
+                ("value", models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(repair_tracker_ids, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="tracker",
+            name="tracker_id",
+            field=models.CharField(
+                blank=True, editable=False, max_length=20, null=True, unique=True
+            ),
+        ),
+    ]
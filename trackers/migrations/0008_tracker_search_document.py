@@ -0,0 +1,127 @@
+# Generated by Django 5.2.5 on 2026-10-18 13:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+DOCUMENT_TABLE = "trackers_trackersearchdocument"
+FTS_TABLE = "trackers_search_fts"
+
+SQLITE_FORWARD = [
+    # External-content FTS5 index over the document table, kept in sync by
+    # triggers so application code only ever writes the plain table.
+    f"""
+    CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        document, content='{DOCUMENT_TABLE}', content_rowid='tracker_id'
+    )
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON {DOCUMENT_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, document)
+        VALUES (new.tracker_id, new.document);
+    END
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON {DOCUMENT_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, document)
+        VALUES ('delete', old.tracker_id, old.document);
+    END
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE ON {DOCUMENT_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, document)
+        VALUES ('delete', old.tracker_id, old.document);
+        INSERT INTO {FTS_TABLE}(rowid, document)
+        VALUES (new.tracker_id, new.document);
+    END
+    """,
+]
+
+SQLITE_BACKWARD = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+POSTGRESQL_FORWARD = [
+    f"""
+    ALTER TABLE {DOCUMENT_TABLE} ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (to_tsvector('english', document)) STORED
+    """,
+    f"""
+    CREATE INDEX trackers_search_vector_gin
+    ON {DOCUMENT_TABLE} USING GIN (search_vector)
+    """,
+]
+
+POSTGRESQL_BACKWARD = [
+    "DROP INDEX IF EXISTS trackers_search_vector_gin",
+    f"ALTER TABLE {DOCUMENT_TABLE} DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def run_for_vendor(forward):
+    def run(apps, schema_editor):
+        statements = {
+            "sqlite": SQLITE_FORWARD if forward else SQLITE_BACKWARD,
+            "postgresql": POSTGRESQL_FORWARD if forward else POSTGRESQL_BACKWARD,
+        }.get(schema_editor.connection.vendor, [])
+        for statement in statements:
+            schema_editor.execute(statement)
+
+    return run
+
+
+def build_documents(apps, schema_editor):
+    Tracker = apps.get_model("trackers", "Tracker")
+    Comment = apps.get_model("trackers", "Comment")
+    TrackerSearchDocument = apps.get_model("trackers", "TrackerSearchDocument")
+    db_alias = schema_editor.connection.alias
+
+    comments = {}
+    for tracker_pk, body in (
+        Comment.objects.using(db_alias)
+        .order_by("pk")
+        .values_list("tracker", "body")
+        .iterator()
+    ):
+        comments.setdefault(tracker_pk, []).append(body)
+
+    documents = (
+        TrackerSearchDocument(
+            tracker_id=pk,
+            document="\n".join([tracker_id or "", title, body, *comments.get(pk, ())]),
+        )
+        for pk, tracker_id, title, body in Tracker.objects.using(db_alias)
+        .values_list("pk", "tracker_id", "title", "body")
+        .iterator()
+    )
+    TrackerSearchDocument.objects.using(db_alias).bulk_create(documents, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("trackers", "0007_tracker_sequence_unique_tracker_id"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TrackerSearchDocument",
+            fields=[
+                (
+                    "tracker",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="search_document",
+                        serialize=False,
+                        to="trackers.tracker",
+                    ),
+                ),
+                ("document", models.TextField(blank=True)),
+            ],
+        ),
+        migrations.RunPython(run_for_vendor(True), run_for_vendor(False)),
+        migrations.RunPython(build_documents, migrations.RunPython.noop),
+    ]
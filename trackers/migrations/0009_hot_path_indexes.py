@@ -0,0 +1,43 @@
+# Generated by Django 5.2.5 on 2026-10-18 13:44
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("trackers", "0008_tracker_search_document"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(
+                fields=["tracker", "created_at"], name="comment_tracker_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="tracker",
+            index=models.Index(fields=["date", "id"], name="tracker_date_id_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="tracker",
+            index=models.Index(
+                fields=["status", "date"], name="tracker_status_date_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="tracker",
+            index=models.Index(
+                fields=["author", "status"], name="tracker_author_status_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="tracker",
+            index=models.Index(
+                fields=["assigned_to", "status"], name="tracker_assignee_status_idx"
+            ),
+        ),
+    ]
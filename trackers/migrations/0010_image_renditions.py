@@ -0,0 +1,23 @@
+# Generated by Django 5.2.5 on 2026-10-18 13:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("trackers", "0009_hot_path_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="comment",
+            name="renditions_ready",
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddField(
+            model_name="trackerimage",
+            name="renditions_ready",
+            field=models.BooleanField(default=False, editable=False),
+        ),
+    ]
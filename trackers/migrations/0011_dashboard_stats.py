@@ -0,0 +1,140 @@
+# Generated by Django 5.2.5 on 2026-10-18 14:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, F
+from django.db.models.functions import TruncDate
+
+
+def build_stats(apps, schema_editor):
+    """
+    Backfill closed_at (the last update is the best guess for trackers that
+    are already closed) and count the existing trackers.
+    """
+    Tracker = apps.get_model("trackers", "Tracker")
+    TrackerStat = apps.get_model("trackers", "TrackerStat")
+    TrackerDailyStat = apps.get_model("trackers", "TrackerDailyStat")
+    trackers = Tracker.objects.using(schema_editor.connection.alias).order_by()
+
+    trackers.filter(status__in=["done", "drop"]).update(closed_at=F("updated_at"))
+
+    counts = trackers.values("author", "assigned_to", "status", "priority")
+    TrackerStat.objects.bulk_create(
+        TrackerStat(
+            author_id=row["author"],
+            assigned_to_id=row["assigned_to"],
+            status=row["status"],
+            priority=row["priority"],
+            count=row["n"],
+        )
+        for row in counts.annotate(n=Count("pk"))
+    )
+
+    daily = {}
+    for field, column in (("created", "date"), ("closed", "closed_at")):
+        days = trackers.filter(**{f"{column}__isnull": False}).values(
+            day=TruncDate(column)
+        )
+        for row in days.annotate(n=Count("pk")):
+            daily.setdefault(row["day"], {"created": 0, "closed": 0})[field] = row["n"]
+    TrackerDailyStat.objects.bulk_create(
+        TrackerDailyStat(date=day, **counts) for day, counts in daily.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("trackers", "0010_image_renditions"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TrackerDailyStat",
+            fields=[
+                ("date", models.DateField(primary_key=True, serialize=False)),
+                ("created", models.IntegerField(default=0)),
+                ("closed", models.IntegerField(default=0)),
+            ],
+            options={
+                "ordering": ["date"],
+            },
+        ),
+        migrations.AddField(
+            model_name="tracker",
+            name="closed_at",
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.CreateModel(
+            name="TrackerStat",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("in_progress", "In Progress"),
+                            ("done", "Done"),
+                            ("drop", "Drop"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "priority",
+                    models.CharField(
+                        choices=[
+                            ("low", "Low"),
+                            ("normal", "Normal"),
+                            ("high", "High"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                ("count", models.IntegerField(default=0)),
+                (
+                    "assigned_to",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "author",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        condition=models.Q(("assigned_to__isnull", False)),
+                        fields=("author", "assigned_to", "status", "priority"),
+                        name="trackerstat_assigned_key",
+                    ),
+                    models.UniqueConstraint(
+                        condition=models.Q(("assigned_to__isnull", True)),
+                        fields=("author", "status", "priority"),
+                        name="trackerstat_unassigned_key",
+                    ),
+                ],
+            },
+        ),
+        migrations.RunPython(build_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.5 on 2026-10-18 14:14
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("trackers", "0011_dashboard_stats"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="tracker",
+            index=models.Index(
+                fields=["priority", "date"], name="tracker_priority_date_idx"
+            ),
+        ),
+    ]
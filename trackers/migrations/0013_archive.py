@@ -0,0 +1,158 @@
+# Generated by Django 5.2.5 on 2026-10-18 14:40
+
+import django.db.models.deletion
+import django.utils.timezone
+import trackers.models
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("trackers", "0012_admin_priority_index"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ArchivedTracker",
+            fields=[
+                ("id", models.BigIntegerField(primary_key=True, serialize=False)),
+                (
+                    "tracker_id",
+                    models.CharField(blank=True, max_length=20, null=True, unique=True),
+                ),
+                ("title", models.CharField(max_length=255)),
+                ("body", models.TextField()),
+                (
+                    "priority",
+                    models.CharField(
+                        choices=[
+                            ("low", "Low"),
+                            ("normal", "Normal"),
+                            ("high", "High"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("in_progress", "In Progress"),
+                            ("done", "Done"),
+                            ("drop", "Drop"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("date", models.DateTimeField()),
+                ("updated_at", models.DateTimeField()),
+                ("closed_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "archived_at",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                ("document", models.TextField(blank=True)),
+                (
+                    "assigned_to",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "author",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-date"],
+            },
+        ),
+        migrations.CreateModel(
+            name="ArchivedComment",
+            fields=[
+                ("id", models.BigIntegerField(primary_key=True, serialize=False)),
+                ("body", models.TextField()),
+                (
+                    "image",
+                    models.ImageField(
+                        blank=True, null=True, upload_to="comment_images/"
+                    ),
+                ),
+                ("renditions_ready", models.BooleanField(default=False)),
+                ("created_at", models.DateTimeField()),
+                (
+                    "author",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "tracker",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="comment_set",
+                        to="trackers.archivedtracker",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-created_at"],
+            },
+            bases=(trackers.models.ImageRenditionsMixin, models.Model),
+        ),
+        migrations.CreateModel(
+            name="ArchivedTrackerImage",
+            fields=[
+                ("id", models.BigIntegerField(primary_key=True, serialize=False)),
+                ("image", models.ImageField(upload_to="tracker_images/")),
+                ("renditions_ready", models.BooleanField(default=False)),
+                ("upload_at", models.DateTimeField()),
+                (
+                    "tracker",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="images",
+                        to="trackers.archivedtracker",
+                    ),
+                ),
+            ],
+            bases=(trackers.models.ImageRenditionsMixin, models.Model),
+        ),
+        migrations.AddIndex(
+            model_name="archivedtracker",
+            index=models.Index(
+                fields=["status", "date"], name="archived_status_date_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="archivedtracker",
+            index=models.Index(
+                fields=["author", "status"], name="archived_author_status_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="archivedtracker",
+            index=models.Index(
+                fields=["assigned_to", "status"], name="archived_assignee_status_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="archivedcomment",
+            index=models.Index(
+                fields=["tracker", "created_at"], name="archived_comment_tracker_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.5 on 2026-10-18 14:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("trackers", "0013_archive"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TrackerSearchMatch",
+            fields=[
+                (
+                    "tracker",
+                    models.OneToOneField(
+                        db_column="rowid",
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        primary_key=True,
+                        related_name="search_match",
+                        serialize=False,
+                        to="trackers.tracker",
+                    ),
+                ),
+                ("query", models.TextField(db_column="trackers_search_fts")),
+                ("rank", models.FloatField()),
+            ],
+            options={
+                "db_table": "trackers_search_fts",
+                "managed": False,
+            },
+        ),
+    ]
@@ -1,12 +1,145 @@
 from django.conf import settings
-from django.db import models
+from django.db import models, router, transaction
+from django.db.models import (
+    BigIntegerField,
+    Count,
+    F,
+    Max,
+    OuterRef,
+    Q,
+    Subquery,
+    Window,
+)
+from django.db.models.functions import Cast, Coalesce, RowNumber, Substr
 from django.urls import reverse
+from django.utils import timezone
+
+from .thumbnails import rendition_name
+
+
+class TrackerQuerySet(models.QuerySet):
+    def for_filter(self, user, filter_type="all"):
+        """Trackers shown under one of the issue list tabs."""
+        involved = Q(author=user) | Q(assigned_to=user)
+
+        if filter_type == "my":
+            return self.filter(involved).exclude(status__in=["drop", "done"])
+
+        if filter_type in ("dropped", "done"):
+            qs = self.filter(status="drop" if filter_type == "dropped" else "done")
+            if not user.is_staff:
+                qs = qs.filter(involved)
+            return qs
+
+        return self.exclude(status__in=["drop", "done"])
+
+    def related_models(self):
+        """The image and comment models of these trackers."""
+        if self.model is ArchivedTracker:
+            return ArchivedTrackerImage, ArchivedComment
+        return TrackerImage, Comment
+
+    def search_backend(self):
+        from .search import ArchiveSearchBackend, get_search_backend
+
+        if self.model is ArchivedTracker:
+            return ArchiveSearchBackend()
+        return get_search_backend(self.db)
+
+    def search(self, query):
+        """Trackers whose id, title, body or comments match ``query``."""
+        if not query:
+            return self
+        return self.search_backend().filter(self, query)
+
+    def ranked_search(self, query):
+        """Like ``search`` but annotated with a ``search_rank`` (higher is better)."""
+        backend = self.search_backend()
+        return backend.filter(self, query).annotate(search_rank=backend.rank(query))
+
+    def with_counts(self):
+        # Correlated subqueries instead of Count() over joins, so the two
+        # counts don't multiply each other and no GROUP BY is needed.
+        def aggregate_of(model, aggregate):
+            return Subquery(
+                model.objects.filter(tracker=OuterRef("pk"))
+                .order_by()
+                .values("tracker")
+                .annotate(value=aggregate)
+                .values("value")
+            )
+
+        images, comments = self.related_models()
+        return self.annotate(
+            image_count=Coalesce(aggregate_of(images, Count("pk")), 0),
+            comment_count=Coalesce(aggregate_of(comments, Count("pk")), 0),
+            last_image_at=aggregate_of(images, Max("upload_at")),
+            last_comment_at=aggregate_of(comments, Max("created_at")),
+        )
+
+    def touch(self):
+        """Mark the trackers as changed now, e.g. when a comment or image changes."""
+        return self.update(updated_at=timezone.now())
+
+    def for_list(self):
+        """
+        Everything the issue list cards need, in a fixed number of queries:
+        the trackers with their users and counts, the first two images and
+        the latest two comments (with authors) per tracker.
+        """
+        images, comments = self.related_models()
+        preview_images = (
+            images.objects.annotate(
+                row=Window(
+                    RowNumber(), partition_by=F("tracker"), order_by=F("pk").asc()
+                )
+            )
+            .filter(row__lte=2)
+            .order_by("pk")
+        )
+        latest_comments = (
+            comments.objects.annotate(
+                row=Window(
+                    RowNumber(),
+                    partition_by=F("tracker"),
+                    order_by=[F("created_at").desc(), F("pk").desc()],
+                )
+            )
+            .filter(row__lte=2)
+            .select_related("author")
+            .order_by("-created_at", "-pk")
+        )
+        return (
+            self.select_related("author", "assigned_to")
+            .with_counts()
+            .prefetch_related(
+                models.Prefetch(
+                    "images", queryset=preview_images, to_attr="preview_images"
+                ),
+                models.Prefetch(
+                    "comment_set", queryset=latest_comments, to_attr="latest_comments"
+                ),
+            )
+        )
 
 
 # Create your models here.
 class Tracker(models.Model):
     class Meta:
         ordering = ["-date"]
+        indexes = [
+            # Keyset pagination of the issue list
+            models.Index(fields=["date", "id"], name="tracker_date_id_idx"),
+            # Status tabs (done / dropped) ordered by date
+            models.Index(fields=["status", "date"], name="tracker_status_date_idx"),
+            # Admin priority filter
+            models.Index(fields=["priority", "date"], name="tracker_priority_date_idx"),
+            # "My" tab and profile counts
+            models.Index(fields=["author", "status"], name="tracker_author_status_idx"),
+            models.Index(
+                fields=["assigned_to", "status"], name="tracker_assignee_status_idx"
+            ),
+        ]
 
     PRIORITY_CHOICES = [
         ("low", "Low"),
@@ -21,7 +154,7 @@ class Tracker(models.Model):
     ]
 
     tracker_id = models.CharField(
-        max_length=20, unique=False, editable=False, null=True, blank=True
+        max_length=20, unique=True, editable=False, null=True, blank=True
     )
     author = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -48,13 +181,37 @@ class Tracker(models.Model):
     )
     date = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # When the tracker was last moved to a closed status; None while active
+    closed_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    objects = TrackerQuerySet.as_manager()
+
+    TRACKER_ID_PREFIX = "PT"
+    CLOSED_STATUSES = ("done", "drop")
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # The state the dashboard statistics counted (see trackers.stats)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
 
     def save(self, *args, **kwargs):
         if not self.tracker_id:
-            last_id = Tracker.objects.all().count() + 1
-            self.tracker_id = f"PT{last_id:05d}"
+            self.tracker_id = self.format_tracker_id(TrackerSequence.allocate()[0])
+        if self.status in self.CLOSED_STATUSES:
+            self.closed_at = self.closed_at or timezone.now()
+        else:
+            self.closed_at = None
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "status" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "closed_at"}
         super().save(*args, **kwargs)
 
+    @classmethod
+    def format_tracker_id(cls, number):
+        return f"{cls.TRACKER_ID_PREFIX}{number:05d}"
+
     def __str__(self):
         return self.title
 
@@ -62,17 +219,72 @@ class Tracker(models.Model):
         return reverse("tracker_detail", kwargs={"pk": self.pk})
 
 
-class TrackerImage(models.Model):
+class ImageRenditionsMixin:
+    """
+    URLs of the downscaled copies of ``image`` (see ``trackers.thumbnails``).
+    Until the renditions exist the JPEG URLs point at the original and the
+    WebP ones are empty.
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # The image the renditions were made from
+        if "image" in field_names:
+            instance._rendered_image = values[field_names.index("image")] or ""
+        return instance
+
+    def save(self, *args, **kwargs):
+        # A replaced image needs new renditions (see trackers.signals)
+        self._image_replaced = (
+            "_rendered_image" in self.__dict__
+            and (self.image.name or "") != self._rendered_image
+        )
+        if self._image_replaced:
+            self.renditions_ready = False
+            update_fields = kwargs.get("update_fields")
+            if update_fields is not None and "image" in update_fields:
+                kwargs["update_fields"] = {*update_fields, "renditions_ready"}
+        super().save(*args, **kwargs)
+        if "image" not in self.get_deferred_fields():
+            self._rendered_image = self.image.name or ""
+
+    def rendition_url(self, rendition, ext="jpg"):
+        if not self.image:
+            return ""
+        if not self.renditions_ready:
+            return self.image.url if ext == "jpg" else ""
+        return self.image.storage.url(rendition_name(self.image.name, rendition, ext))
+
+    @property
+    def thumb_url(self):
+        return self.rendition_url("thumb")
+
+    @property
+    def thumb_webp_url(self):
+        return self.rendition_url("thumb", "webp")
+
+    @property
+    def preview_url(self):
+        return self.rendition_url("preview")
+
+    @property
+    def preview_webp_url(self):
+        return self.rendition_url("preview", "webp")
+
+
+class TrackerImage(ImageRenditionsMixin, models.Model):
     tracker = models.ForeignKey(
         "Tracker",
         on_delete=models.CASCADE,
         related_name="images",
     )
     image = models.ImageField(upload_to="tracker_images/")
+    renditions_ready = models.BooleanField(default=False, editable=False)
     upload_at = models.DateTimeField(auto_now_add=True)
 
 
-class Comment(models.Model):
+class Comment(ImageRenditionsMixin, models.Model):
     tracker = models.ForeignKey(
         "Tracker",
         on_delete=models.CASCADE,
@@ -80,13 +292,245 @@ class Comment(models.Model):
     author = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     body = models.TextField()
     image = models.ImageField(upload_to="comment_images/", null=True, blank=True)  # NEW
+    renditions_ready = models.BooleanField(default=False, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # Latest comments of a tracker
+            models.Index(
+                fields=["tracker", "created_at"], name="comment_tracker_created_idx"
+            ),
+        ]
 
     def __str__(self):
         return self.body
 
     def get_absolute_url(self):
         return reverse("tracker_detail", kwargs={"pk": self.tracker.pk})
+
+
+class ArchivedTracker(models.Model):
+    """
+    A tracker closed long ago, moved out of ``Tracker`` by ``archive_trackers``
+    (see ``trackers.archive``). It keeps its primary key and tracker id, so
+    its page and links stay the same; reopening it moves it back.
+    """
+
+    id = models.BigIntegerField(primary_key=True)
+    tracker_id = models.CharField(max_length=20, unique=True, null=True, blank=True)
+    author = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="+"
+    )
+    assigned_to = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+    title = models.CharField(max_length=255)
+    body = models.TextField()
+    priority = models.CharField(max_length=10, choices=Tracker.PRIORITY_CHOICES)
+    status = models.CharField(max_length=20, choices=Tracker.STATUS_CHOICES)
+    date = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    closed_at = models.DateTimeField(null=True, blank=True)
+    archived_at = models.DateTimeField(default=timezone.now)
+    # The tracker's search document, matched with a plain substring search
+    document = models.TextField(blank=True)
+
+    objects = TrackerQuerySet.as_manager()
+
+    class Meta:
+        ordering = ["-date"]
+        indexes = [
+            # Done / dropped tabs ordered by date
+            models.Index(fields=["status", "date"], name="archived_status_date_idx"),
+            models.Index(
+                fields=["author", "status"], name="archived_author_status_idx"
+            ),
+            models.Index(
+                fields=["assigned_to", "status"], name="archived_assignee_status_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return self.title
+
+    def get_absolute_url(self):
+        return reverse("tracker_detail", kwargs={"pk": self.pk})
+
+
+class ArchivedTrackerImage(ImageRenditionsMixin, models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    tracker = models.ForeignKey(
+        ArchivedTracker, on_delete=models.CASCADE, related_name="images"
+    )
+    image = models.ImageField(upload_to="tracker_images/")
+    renditions_ready = models.BooleanField(default=False)
+    upload_at = models.DateTimeField()
+
+
+class ArchivedComment(ImageRenditionsMixin, models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    tracker = models.ForeignKey(
+        ArchivedTracker, on_delete=models.CASCADE, related_name="comment_set"
+    )
+    author = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="+"
+    )
+    body = models.TextField()
+    image = models.ImageField(upload_to="comment_images/", null=True, blank=True)
+    renditions_ready = models.BooleanField(default=False)
+    created_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(
+                fields=["tracker", "created_at"], name="archived_comment_tracker_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return self.body
+
+
+class TrackerSearchDocument(models.Model):
+    """Denormalised text of a tracker and its comments, indexed for search."""
+
+    tracker = models.OneToOneField(
+        "Tracker",
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="search_document",
+    )
+    document = models.TextField(blank=True)
+
+    def __str__(self):
+        return f"Search document for {self.tracker_id}"
+
+
+class TrackerSearchMatch(models.Model):
+    """
+    The SQLite FTS5 index of the search documents (see ``trackers.search``),
+    so searches can join it: a row's rowid is its tracker's id. The table only
+    exists on SQLite.
+    """
+
+    tracker = models.OneToOneField(
+        "Tracker",
+        on_delete=models.DO_NOTHING,
+        primary_key=True,
+        db_column="rowid",
+        related_name="search_match",
+    )
+    # The column named after the table takes the query: "= %s" is MATCH
+    query = models.TextField(db_column="trackers_search_fts")
+    # bm25 of the match, more negative is more relevant
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = "trackers_search_fts"
+
+
+class TrackerSequence(models.Model):
+    """
+    Named counters handing out tracker numbers.
+
+    Allocation is a single ``UPDATE ... SET value = value + n`` on one row, so
+    it costs the same no matter how many trackers exist and concurrent
+    creators are serialised by the row lock instead of racing on a COUNT.
+    """
+
+    TRACKER = "tracker"
+
+    name = models.CharField(max_length=50, primary_key=True)
+    value = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name}={self.value}"
+
+    @classmethod
+    def allocate(cls, count=1, name=TRACKER):
+        """Reserve ``count`` consecutive numbers and return them as a range."""
+        using = router.db_for_write(cls)
+        counters = cls.objects.using(using).filter(name=name)
+
+        with transaction.atomic(using=using):
+            if not counters.update(value=F("value") + count):
+                cls.objects.using(using).get_or_create(
+                    name=name, defaults={"value": cls._highest_tracker_number(using)}
+                )
+                counters.update(value=F("value") + count)
+            value = counters.values_list("value", flat=True).get()
+
+        return range(value - count + 1, value + 1)
+
+    @staticmethod
+    def _highest_tracker_number(using):
+        # Only used if the counter row is missing; the migration seeds it.
+        number = Substr("tracker_id", len(Tracker.TRACKER_ID_PREFIX) + 1)
+        highest = Tracker.objects.using(using).aggregate(
+            highest=Max(Cast(number, BigIntegerField()))
+        )["highest"]
+        return highest or 0
+
+
+class TrackerStat(models.Model):
+    """
+    Number of trackers per author, assignee, status and priority.
+
+    Kept up to date incrementally by ``trackers.stats`` so the dashboard and
+    profile counts never aggregate over the tracker table;
+    ``reconcile_tracker_stats`` rebuilds it from scratch.
+    """
+
+    author = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="+"
+    )
+    assigned_to = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+    status = models.CharField(max_length=20, choices=Tracker.STATUS_CHOICES)
+    priority = models.CharField(max_length=10, choices=Tracker.PRIORITY_CHOICES)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            # NULLs are distinct in a plain unique constraint
+            models.UniqueConstraint(
+                fields=["author", "assigned_to", "status", "priority"],
+                condition=models.Q(assigned_to__isnull=False),
+                name="trackerstat_assigned_key",
+            ),
+            models.UniqueConstraint(
+                fields=["author", "status", "priority"],
+                condition=models.Q(assigned_to__isnull=True),
+                name="trackerstat_unassigned_key",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.author_id}/{self.assigned_to_id}/{self.status}/{self.priority}={self.count}"
+
+
+class TrackerDailyStat(models.Model):
+    """Trackers created and closed per day, maintained with ``TrackerStat``."""
+
+    date = models.DateField(primary_key=True)
+    created = models.IntegerField(default=0)
+    closed = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ["date"]
+
+    def __str__(self):
+        return f"{self.date}: +{self.created} -{self.closed}"
@@ -0,0 +1,116 @@
+import base64
+from datetime import datetime
+
+from django.db.models import Q
+
+
+class KeysetPage:
+    """One page of a keyset-paginated queryset and the cursor to the next."""
+
+    def __init__(self, object_list, next_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+def encode_cursor(obj, field="date"):
+    value = getattr(obj, field)
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    raw = f"{value!s}|{obj.pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, parse=datetime.fromisoformat):
+    """Return the ``(value, pk)`` pair of a cursor, or ``None`` if it is invalid."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        value, pk = base64.urlsafe_b64decode(padded.encode()).decode().split("|")
+        return parse(value), int(pk)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def keyset_queryset(queryset, cursor, field="date", parse=datetime.fromisoformat):
+    """Order ``queryset`` by ``(field, pk)`` descending, starting after ``cursor``."""
+    queryset = queryset.order_by(f"-{field}", "-pk")
+
+    position = decode_cursor(cursor, parse) if cursor else None
+    if position:
+        value, pk = position
+        queryset = queryset.filter(
+            Q(**{f"{field}__lt": value}) | Q(**{field: value, "pk__lt": pk})
+        )
+    return queryset
+
+
+def keyset_page(rows, page_size, field="date"):
+    # One extra row tells us whether there is a next page without a COUNT.
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        return KeysetPage(rows, encode_cursor(rows[-1], field))
+    return KeysetPage(rows)
+
+
+def paginate_keyset(
+    queryset, cursor, page_size, field="date", parse=datetime.fromisoformat
+):
+    """
+    Return the page of ``queryset`` after ``cursor``, highest ``field`` first.
+
+    Rows are ordered by ``(field, pk)`` descending and the next page starts
+    strictly after the last row seen, so every page is a bounded range scan
+    instead of an OFFSET that gets slower the further the user scrolls.
+    ``parse`` turns the cursor's string value back into a ``field`` value.
+    """
+    queryset = keyset_queryset(queryset, cursor, field, parse)
+    return keyset_page(list(queryset[: page_size + 1]), page_size, field)
+
+
+async def apaginate_keyset(
+    queryset, cursor, page_size, field="date", parse=datetime.fromisoformat
+):
+    """Async version of ``paginate_keyset``."""
+    queryset = keyset_queryset(queryset, cursor, field, parse)
+    rows = [row async for row in queryset[: page_size + 1]]
+    return keyset_page(rows, page_size, field)
+
+
+def merged_rows(rows, field="date"):
+    return sorted(rows, key=lambda row: (getattr(row, field), row.pk), reverse=True)
+
+
+def paginate_keyset_merged(
+    querysets, cursor, page_size, field="date", parse=datetime.fromisoformat
+):
+    """
+    ``paginate_keyset`` over several querysets at once, e.g. trackers and
+    archived trackers. Each contributes its own next ``page_size + 1`` rows
+    and the page is the highest of those, so it costs one bounded query per
+    queryset. Primary keys must be unique across the querysets.
+    """
+    rows = []
+    for queryset in querysets:
+        queryset = keyset_queryset(queryset, cursor, field, parse)
+        rows.extend(queryset[: page_size + 1])
+    return keyset_page(merged_rows(rows, field), page_size, field)
+
+
+async def apaginate_keyset_merged(
+    querysets, cursor, page_size, field="date", parse=datetime.fromisoformat
+):
+    """Async version of ``paginate_keyset_merged``."""
+    rows = []
+    for queryset in querysets:
+        queryset = keyset_queryset(queryset, cursor, field, parse)
+        rows.extend([row async for row in queryset[: page_size + 1]])
+    return keyset_page(merged_rows(rows, field), page_size, field)
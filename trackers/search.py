@@ -0,0 +1,167 @@
+"""
+Full-text search over trackers.
+
+Every tracker has a denormalised ``TrackerSearchDocument`` (tracker id,
+title, body and comment bodies) kept up to date by the signals in
+``trackers.signals``. How that document is indexed depends on the database:
+
+* SQLite: an external-content FTS5 table kept in sync by triggers.
+* PostgreSQL: a generated ``tsvector`` column with a GIN index.
+* Anything else: a plain ``icontains`` over the document.
+
+Archived trackers (``trackers.archive``) carry a copy of their document and
+are searched with ``icontains`` as well.
+
+The table, triggers and columns are created by migration 0008.
+"""
+
+import re
+
+from django.db import connections, router
+from django.db.models import F, FloatField, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Concat
+
+from .models import Comment, Tracker, TrackerSearchDocument, TrackerSearchMatch
+
+FTS_TABLE = TrackerSearchMatch._meta.db_table
+
+TOKEN_RE = re.compile(r"\w+")
+
+
+def build_document(tracker, comment_bodies=()):
+    return "\n".join(
+        [tracker.tracker_id or "", tracker.title, tracker.body, *comment_bodies]
+    )
+
+
+def index_tracker(tracker):
+    """Rebuild the search document of one tracker."""
+    comment_bodies = Comment.objects.filter(tracker=tracker).values_list(
+        "body", flat=True
+    )
+    TrackerSearchDocument.objects.update_or_create(
+        tracker=tracker,
+        defaults={"document": build_document(tracker, comment_bodies)},
+    )
+
+
+def index_trackers(trackers, batch_size=500):
+    """
+    Rebuild the search documents of many trackers in bulk, e.g. after
+    ``bulk_create`` which skips the signals.
+    """
+    trackers = list(trackers)
+    comment_bodies = {}
+    comments = Comment.objects.filter(tracker__in=trackers).order_by("pk")
+    for tracker_pk, body in comments.values_list("tracker", "body").iterator():
+        comment_bodies.setdefault(tracker_pk, []).append(body)
+
+    TrackerSearchDocument.objects.filter(tracker__in=trackers).delete()
+    TrackerSearchDocument.objects.bulk_create(
+        [
+            TrackerSearchDocument(
+                tracker=tracker,
+                document=build_document(tracker, comment_bodies.get(tracker.pk, ())),
+            )
+            for tracker in trackers
+        ],
+        batch_size=batch_size,
+    )
+
+
+def append_comment(comment):
+    """Add a new comment's body to its tracker's document without a rebuild."""
+    document = TrackerSearchDocument.objects.filter(tracker_id=comment.tracker_id)
+    appended = document.update(
+        document=Concat(F("document"), Value(f"\n{comment.body}"))
+    )
+    if not appended:
+        index_tracker(comment.tracker)
+
+
+def tokenize(query):
+    return TOKEN_RE.findall(query.lower())
+
+
+class FallbackSearchBackend:
+    """Substring match over the document for databases without FTS support."""
+
+    def filter(self, queryset, query):
+        tokens = tokenize(query)
+        if not tokens:
+            return queryset.none()
+        for token in tokens:
+            queryset = queryset.filter(search_document__document__icontains=token)
+        return queryset
+
+    def rank(self, query):
+        return Value(0.0, output_field=FloatField())
+
+
+class ArchiveSearchBackend(FallbackSearchBackend):
+    """
+    Archived trackers keep a copy of their document, without a full-text
+    index. Every match ranks 0, after the current trackers' matches.
+    """
+
+    def filter(self, queryset, query):
+        tokens = tokenize(query)
+        if not tokens:
+            return queryset.none()
+        for token in tokens:
+            queryset = queryset.filter(document__icontains=token)
+        return queryset
+
+
+class SQLiteSearchBackend(FallbackSearchBackend):
+    def match_expression(self, query):
+        # Every word must match, as a prefix so "PT0001" finds "PT00012".
+        return " ".join(f'"{token}"*' for token in tokenize(query))
+
+    def filter(self, queryset, query):
+        if not tokenize(query):
+            return queryset.none()
+        # A join rather than a subquery, so rank() reads the rank of the same
+        # match instead of running it again for every row.
+        return queryset.filter(search_match__query=self.match_expression(query))
+
+    def rank(self, query):
+        # FTS5's rank is bm25, where more negative means more relevant.
+        return F("search_match__rank") * -1
+
+
+class PostgreSQLSearchBackend(FallbackSearchBackend):
+    def ts_query(self, query):
+        return " & ".join(f"{token}:*" for token in tokenize(query))
+
+    def filter(self, queryset, query):
+        if not tokenize(query):
+            return queryset.none()
+        return queryset.filter(
+            pk__in=RawSQL(
+                f"SELECT tracker_id FROM {TrackerSearchDocument._meta.db_table} "
+                "WHERE search_vector @@ to_tsquery('english', %s)",
+                [self.ts_query(query)],
+            )
+        )
+
+    def rank(self, query):
+        return RawSQL(
+            "SELECT ts_rank(search_vector, to_tsquery('english', %s)) "
+            f"FROM {TrackerSearchDocument._meta.db_table} "
+            f"WHERE tracker_id = {Tracker._meta.db_table}.id",
+            [self.ts_query(query)],
+            output_field=FloatField(),
+        )
+
+
+BACKENDS = {
+    "sqlite": SQLiteSearchBackend,
+    "postgresql": PostgreSQLSearchBackend,
+}
+
+
+def get_search_backend(using=None):
+    using = using or router.db_for_read(Tracker)
+    return BACKENDS.get(connections[using].vendor, FallbackSearchBackend)()
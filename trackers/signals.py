@@ -0,0 +1,170 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import Signal, receiver
+
+from . import events, search, stats
+from .fragments import invalidate_tracker_cards
+from .models import Comment, Tracker, TrackerImage
+from .thumbnails import schedule_renditions
+
+# Sent after trackers were changed with a queryset update(), which skips
+# post_save. Arguments: pks, fields.
+trackers_bulk_updated = Signal()
+
+SEARCHABLE_FIELDS = {"tracker_id", "title", "body"}
+COUNTED_FIELDS = {
+    "author",
+    "author_id",
+    "assigned_to",
+    "assigned_to_id",
+    "status",
+    "priority",
+    "closed_at",
+}
+
+
+def deleted_with_tracker(instance, origin):
+    """Whether a comment or image is being deleted along with its tracker."""
+    return instance.tracker_id in getattr(origin, "_deleted_tracker_pks", ())
+
+
+# ----------------------------
+# Search index
+# ----------------------------
+@receiver(pre_delete, sender=Tracker)
+def remember_deleted_tracker(sender, instance, origin=None, **kwargs):
+    # Deletions send pre_delete for everything they collected before deleting
+    # anything, so the children's post_delete can tell their tracker goes too,
+    # whether the deletion started at it, a queryset or e.g. its author.
+    if origin is not None:
+        origin.__dict__.setdefault("_deleted_tracker_pks", set()).add(instance.pk)
+
+
+@receiver(post_save, sender=Tracker)
+def index_tracker_on_save(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and not SEARCHABLE_FIELDS & set(update_fields):
+        return
+    search.index_tracker(instance)
+
+
+@receiver(post_save, sender=Comment)
+def index_comment_on_save(sender, instance, created, **kwargs):
+    if created:
+        search.append_comment(instance)
+    else:
+        search.index_tracker(instance.tracker)
+
+
+@receiver(post_delete, sender=Comment)
+def index_comment_on_delete(sender, instance, origin=None, **kwargs):
+    # The tracker's document goes with it
+    if deleted_with_tracker(instance, origin):
+        return
+    search.index_tracker(instance.tracker)
+
+
+# ----------------------------
+# Image renditions
+# ----------------------------
+@receiver(post_save, sender=TrackerImage)
+@receiver(post_save, sender=Comment)
+def schedule_image_renditions(sender, instance, created, **kwargs):
+    if instance.image and (created or instance._image_replaced):
+        schedule_renditions(instance)
+
+
+# ----------------------------
+# Tracker timestamps
+# ----------------------------
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+@receiver(post_save, sender=TrackerImage)
+@receiver(post_delete, sender=TrackerImage)
+def touch_tracker_on_child_change(sender, instance, origin=None, **kwargs):
+    if deleted_with_tracker(instance, origin):
+        return
+    # updated_at covers comments and images, for the conditional GET validators
+    Tracker.objects.filter(pk=instance.tracker_id).touch()
+
+
+# ----------------------------
+# Cached tracker cards
+# ----------------------------
+@receiver(post_save, sender=Tracker)
+@receiver(post_delete, sender=Tracker)
+def invalidate_card_on_tracker_change(sender, instance, **kwargs):
+    invalidate_tracker_cards([instance.pk])
+
+
+@receiver(trackers_bulk_updated, sender=Tracker)
+def invalidate_cards_on_bulk_update(sender, pks, **kwargs):
+    invalidate_tracker_cards(pks)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+@receiver(post_save, sender=TrackerImage)
+@receiver(post_delete, sender=TrackerImage)
+def invalidate_card_on_child_change(sender, instance, **kwargs):
+    invalidate_tracker_cards([instance.tracker_id])
+
+
+# ----------------------------
+# Live updates
+# ----------------------------
+@receiver(post_save, sender=Comment)
+def publish_new_comment(sender, instance, created, **kwargs):
+    if created:
+        tracker_pk = instance.tracker_id
+        transaction.on_commit(lambda: events.publish(tracker_pk, "comment"))
+
+
+@receiver(post_save, sender=Tracker)
+def publish_tracker_change(sender, instance, created, **kwargs):
+    if not created:
+        tracker_pk = instance.pk
+        transaction.on_commit(lambda: events.publish(tracker_pk, "tracker"))
+
+
+@receiver(trackers_bulk_updated, sender=Tracker)
+def publish_bulk_change(sender, pks, **kwargs):
+    for pk in pks:
+        events.publish(pk, "tracker")
+
+
+# ----------------------------
+# Dashboard statistics
+# ----------------------------
+def counts_change(instance, update_fields):
+    return update_fields is None or COUNTED_FIELDS & set(update_fields)
+
+
+@receiver(pre_save, sender=Tracker)
+def remember_counted_values(sender, instance, update_fields=None, **kwargs):
+    if not instance._state.adding and counts_change(instance, update_fields):
+        instance._counted_values = stats.loaded_values(instance)
+
+
+@receiver(post_save, sender=Tracker)
+def count_saved_tracker(sender, instance, created, update_fields=None, **kwargs):
+    if not counts_change(instance, update_fields):
+        return
+    loaded = None if created else instance.__dict__.pop("_counted_values", None)
+    values = stats.current_values(instance, loaded)
+    before = stats.tracker_state(loaded) if loaded else None
+    after = stats.tracker_state(values)
+    if before != after:
+        stats.record_change(before, after)
+    # Later saves of this instance start from what is counted now
+    instance._loaded_values = {**getattr(instance, "_loaded_values", {}), **values}
+
+
+@receiver(post_delete, sender=Tracker)
+def count_deleted_tracker(sender, instance, **kwargs):
+    stats.record_change(before=stats.tracker_state(instance.__dict__))
+
+
+@receiver(pre_delete, sender=settings.AUTH_USER_MODEL)
+def unassign_deleted_user_stats(sender, instance, **kwargs):
+    stats.unassign_user_stats(instance)
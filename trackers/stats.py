@@ -0,0 +1,342 @@
+"""
+Tracker statistics for profiles and the dashboard.
+
+``TrackerStat`` (trackers per author, assignee, status and priority) and
+``TrackerDailyStat`` (created and closed per day) are a materialised GROUP BY
+over ``Tracker`` and ``ArchivedTracker``, maintained incrementally: every change to trackers is
+expressed as tracker states that stop or start being counted
+(``apply_changes``), by the signals in ``trackers.signals`` and by
+``apply_bulk_action``. Reads aggregate over these tables, whose size depends
+on the number of users and days, not trackers.
+
+Concurrent edits of one tracker can make the counts drift;
+``reconcile_tracker_stats`` rebuilds both tables and is meant to run
+periodically.
+"""
+
+from collections import Counter
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from .models import ArchivedTracker, Tracker, TrackerDailyStat, TrackerStat
+
+ACTIVE_STATUS = "in_progress"
+
+# Tracker attributes a state is made of
+STATE_FIELDS = (
+    "author_id",
+    "assigned_to_id",
+    "status",
+    "priority",
+    "date",
+    "closed_at",
+)
+
+
+# ----------------------------
+# Incremental maintenance
+# ----------------------------
+def tracker_state(values):
+    """
+    ``(author, assignee, status, priority, created day, closed day)`` from a
+    mapping of ``STATE_FIELDS``.
+    """
+    closed_at = values["closed_at"]
+    return (
+        values["author_id"],
+        values["assigned_to_id"],
+        values["status"],
+        values["priority"],
+        timezone.localdate(values["date"]),
+        timezone.localdate(closed_at) if closed_at else None,
+    )
+
+
+def loaded_values(tracker):
+    """The ``STATE_FIELDS`` values ``tracker`` is counted with, before a save."""
+    values = getattr(tracker, "_loaded_values", {})
+    if not all(field in values for field in STATE_FIELDS):
+        # Not loaded from the database, or loaded with deferred fields
+        values = Tracker.objects.filter(pk=tracker.pk).values(*STATE_FIELDS).first()
+    return values and {field: values[field] for field in STATE_FIELDS}
+
+
+def current_values(tracker, loaded=None):
+    """``STATE_FIELDS`` after a save; deferred fields keep their ``loaded`` value."""
+    return {
+        field: tracker.__dict__[field] if field in tracker.__dict__ else loaded[field]
+        for field in STATE_FIELDS
+    }
+
+
+def tracker_states(queryset):
+    """A ``Counter`` of the states of the trackers in ``queryset``, in one query."""
+    rows = (
+        queryset.order_by()
+        .values(
+            "author_id",
+            "assigned_to_id",
+            "status",
+            "priority",
+            created_day=TruncDate("date"),
+            closed_day=TruncDate("closed_at"),
+        )
+        .annotate(n=Count("pk"))
+    )
+    return Counter(
+        {
+            (
+                row["author_id"],
+                row["assigned_to_id"],
+                row["status"],
+                row["priority"],
+                row["created_day"],
+                row["closed_day"],
+            ): row["n"]
+            for row in rows
+        }
+    )
+
+
+def record_change(before=None, after=None):
+    """Count one tracker as ``after`` instead of ``before`` (either may be None)."""
+    changes = Counter()
+    if before:
+        changes[before] -= 1
+    if after:
+        changes[after] += 1
+    apply_changes(changes)
+
+
+def apply_changes(changes):
+    """Apply ``{state: number of trackers gained (or lost)}`` to both tables."""
+    counts, daily = Counter(), {}
+    for state, delta in changes.items():
+        if not delta:
+            continue
+        author, assignee, status, priority, created_day, closed_day = state
+        counts[(author, assignee, status, priority)] += delta
+        daily.setdefault(created_day, Counter())["created"] += delta
+        if closed_day:
+            daily.setdefault(closed_day, Counter())["closed"] += delta
+
+    for (author, assignee, status, priority), delta in counts.items():
+        if delta:
+            add_to_row(
+                TrackerStat,
+                {
+                    "author_id": author,
+                    "assigned_to_id": assignee,
+                    "status": status,
+                    "priority": priority,
+                },
+                {"count": delta},
+            )
+    for day, deltas in daily.items():
+        deltas = {field: delta for field, delta in deltas.items() if delta}
+        if deltas:
+            add_to_row(TrackerDailyStat, {"date": day}, deltas)
+
+
+def add_to_row(model, key, deltas):
+    rows = model.objects.filter(**key)
+    increments = {field: F(field) + delta for field, delta in deltas.items()}
+    if rows.update(**increments):
+        return
+    if any(delta < 0 for delta in deltas.values()):
+        # Nothing counted to take away from, e.g. the row of a user being
+        # deleted is already gone.
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**key, **deltas)
+    except IntegrityError:
+        # Created concurrently
+        rows.update(**increments)
+
+
+def unassign_user_stats(user):
+    """Count ``user``'s assigned trackers as unassigned, as deleting them will."""
+    rows = TrackerStat.objects.filter(assigned_to=user)
+    for row in rows:
+        add_to_row(
+            TrackerStat,
+            {
+                "author_id": row.author_id,
+                "assigned_to_id": None,
+                "status": row.status,
+                "priority": row.priority,
+            },
+            {"count": row.count},
+        )
+    rows.delete()
+
+
+def rebuild_tracker_stats():
+    """
+    Recompute both tables from the trackers. Returns how many rows were
+    wrong (missing, extra or with another count).
+    """
+    with transaction.atomic():
+        expected = Counter()
+        expected_daily = {}
+        # Archived trackers are counted too
+        for model in (Tracker, ArchivedTracker):
+            rows = model.objects.order_by().values(
+                "author_id", "assigned_to_id", "status", "priority"
+            )
+            for row in rows.annotate(n=Count("pk")):
+                n = row.pop("n")
+                expected[tuple(row.values())] += n
+
+            for field, column in (("created", "date"), ("closed", "closed_at")):
+                days = (
+                    model.objects.filter(**{f"{column}__isnull": False})
+                    .order_by()
+                    .values(day=TruncDate(column))
+                    .annotate(n=Count("pk"))
+                )
+                for row in days:
+                    counts = expected_daily.setdefault(row["day"], Counter())
+                    counts[field] += row["n"]
+
+        current = {
+            (row.author_id, row.assigned_to_id, row.status, row.priority): row.count
+            for row in TrackerStat.objects.all()
+        }
+        current_daily = {
+            row.date: Counter(created=row.created, closed=row.closed)
+            for row in TrackerDailyStat.objects.all()
+        }
+        wrong = sum(
+            expected.get(key, 0) != current.get(key, 0)
+            for key in expected.keys() | current.keys()
+        ) + sum(
+            +expected_daily.get(day, Counter()) != +current_daily.get(day, Counter())
+            for day in expected_daily.keys() | current_daily.keys()
+        )
+
+        TrackerStat.objects.all().delete()
+        TrackerStat.objects.bulk_create(
+            TrackerStat(
+                author_id=author,
+                assigned_to_id=assignee,
+                status=status,
+                priority=priority,
+                count=n,
+            )
+            for (author, assignee, status, priority), n in expected.items()
+        )
+        TrackerDailyStat.objects.all().delete()
+        TrackerDailyStat.objects.bulk_create(
+            TrackerDailyStat(date=day, created=n["created"], closed=n["closed"])
+            for day, n in expected_daily.items()
+        )
+    return wrong
+
+
+# ----------------------------
+# Reads
+# ----------------------------
+def stats_query(user):
+    """The queryset and aggregates behind ``user_tracker_stats``."""
+    authored = Q(author=user)
+    assigned = Q(assigned_to=user)
+    active = Q(status=ACTIVE_STATUS)
+
+    def total(condition):
+        return Coalesce(Sum("count", filter=condition), 0)
+
+    aggregates = {}
+    for status, _ in Tracker.STATUS_CHOICES:
+        aggregates[f"authored__{status}"] = total(authored & Q(status=status))
+        aggregates[f"assigned__{status}"] = total(assigned & Q(status=status))
+    for priority, _ in Tracker.PRIORITY_CHOICES:
+        aggregates[f"priority__{priority}"] = total(active & Q(priority=priority))
+    return TrackerStat.objects.filter(authored | assigned), aggregates
+
+
+def group_counts(counts):
+    stats = {"authored": {}, "assigned": {}, "priority": {}}
+    for key, value in counts.items():
+        group, name = key.split("__")
+        stats[group][name] = value
+    return stats
+
+
+def user_tracker_stats(user):
+    """
+    Tracker counts for one user's profile, from a single aggregate query:
+
+    * ``authored``: trackers they created, per status
+    * ``assigned``: trackers assigned to them, per status
+    * ``priority``: their active trackers (created or assigned), per priority
+    """
+    queryset, aggregates = stats_query(user)
+    return group_counts(queryset.aggregate(**aggregates))
+
+
+async def auser_tracker_stats(user):
+    """Async version of ``user_tracker_stats``."""
+    queryset, aggregates = stats_query(user)
+    return group_counts(await queryset.aaggregate(**aggregates))
+
+
+def dashboard_stats(days=14, assignees=10):
+    """Backlog overview for the home page, read from the statistics tables."""
+    matrix = {
+        status: {priority: 0 for priority, _ in Tracker.PRIORITY_CHOICES}
+        for status, _ in Tracker.STATUS_CHOICES
+    }
+    totals = TrackerStat.objects.values("status", "priority").annotate(n=Sum("count"))
+    for row in totals:
+        matrix[row["status"]][row["priority"]] = row["n"]
+
+    busiest = (
+        TrackerStat.objects.filter(status=ACTIVE_STATUS)
+        .values("assigned_to", "assigned_to__username")
+        .annotate(n=Sum("count"))
+        .filter(n__gt=0)
+        .order_by("-n", "assigned_to__username")[:assignees]
+    )
+
+    today = timezone.localdate()
+    first = today - timedelta(days=days - 1)
+    recorded = {
+        row.date: row for row in TrackerDailyStat.objects.filter(date__gte=first)
+    }
+    daily = []
+    for offset in range(days):
+        day = first + timedelta(days=offset)
+        row = recorded.get(day)
+        daily.append(
+            {
+                "date": day,
+                "created": row.created if row else 0,
+                "closed": row.closed if row else 0,
+            }
+        )
+
+    statuses = dict(Tracker.STATUS_CHOICES)
+    return {
+        "priorities": [label for _, label in Tracker.PRIORITY_CHOICES],
+        "rows": [
+            {
+                "status": status,
+                "label": statuses[status],
+                "counts": list(counts.values()),
+                "total": sum(counts.values()),
+            }
+            for status, counts in matrix.items()
+        ],
+        "assignees": [
+            {"name": row["assigned_to__username"] or "Unassigned", "count": row["n"]}
+            for row in busiest
+        ],
+        "daily": daily,
+        "max_daily": max([1, *(max(day["created"], day["closed"]) for day in daily)]),
+    }
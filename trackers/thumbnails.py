@@ -0,0 +1,142 @@
+"""
+Downscaled renditions of uploaded images.
+
+Every tracker and comment image gets a small square ``thumb`` (list cards)
+and a bounded ``preview`` (detail page), each as JPEG and WebP, stored next to
+the original under ``<upload dir>/renditions/``. They are generated off the
+request path once the upload is committed; until then templates fall back to
+the original file.
+
+``TRACKERS_THUMBNAIL_QUEUE`` selects how jobs run: ``"thread"`` (default) uses
+an in-process worker pool, ``"sync"`` runs them inline (tests, management
+commands), or a dotted path to a callable taking ``(job, *args)`` plugs in
+another queue.
+"""
+
+import logging
+import posixpath
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from django.utils.module_loading import import_string
+from PIL import Image, ImageOps
+
+from .fragments import invalidate_tracker_cards
+
+logger = logging.getLogger(__name__)
+
+# name: (width, height, crop to fill)
+RENDITIONS = {
+    "thumb": (120, 120, True),
+    "preview": (500, 500, False),
+}
+FORMATS = {
+    "jpg": ("JPEG", {"quality": 82, "optimize": True, "progressive": True}),
+    "webp": ("WEBP", {"quality": 80, "method": 4}),
+}
+
+
+def rendition_name(name, rendition, ext):
+    directory, filename = posixpath.split(name)
+    stem = posixpath.splitext(filename)[0]
+    return posixpath.join(directory, "renditions", f"{stem}.{rendition}.{ext}")
+
+
+def generate_renditions(field_file):
+    """Write every rendition of ``field_file`` to its storage."""
+    storage = field_file.storage
+    with storage.open(field_file.name, "rb") as fh:
+        original = Image.open(fh)
+        # Let JPEG decoding skip straight to roughly the largest size needed
+        original.draft("RGB", (1000, 1000))
+        original = ImageOps.exif_transpose(original).convert("RGB")
+
+    for rendition, (width, height, crop) in RENDITIONS.items():
+        if crop:
+            image = ImageOps.fit(original, (width, height), Image.LANCZOS)
+        else:
+            image = original.copy()
+            image.thumbnail((width, height), Image.LANCZOS)
+
+        for ext, (image_format, options) in FORMATS.items():
+            buffer = BytesIO()
+            image.save(buffer, image_format, **options)
+            name = rendition_name(field_file.name, rendition, ext)
+            if storage.exists(name):
+                storage.delete(name)
+            storage.save(name, ContentFile(buffer.getvalue()))
+
+
+def process(model_label, pk):
+    """Queue job: render one object's image and mark its renditions ready."""
+    model = apps.get_model(model_label)
+    obj = model.objects.filter(pk=pk).first()
+    if obj is None or not obj.image:
+        return
+    try:
+        generate_renditions(obj.image)
+    except (OSError, Image.DecompressionBombError):
+        logger.exception("Could not generate renditions for %s %s", model_label, pk)
+        return
+    # Unless the image was replaced meanwhile; its own job marks it
+    model.objects.filter(pk=pk, image=obj.image.name).update(renditions_ready=True)
+    # The page now shows the renditions instead of the original
+    apps.get_model("trackers", "Tracker").objects.filter(pk=obj.tracker_id).touch()
+    invalidate_tracker_cards([obj.tracker_id])
+
+
+# ----------------------------
+# Queue
+# ----------------------------
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    # Requests scheduling their first job at once must share one pool
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.TRACKERS_THUMBNAIL_WORKERS,
+                thread_name_prefix="thumbnails",
+            )
+    return _executor
+
+
+def _run_in_thread(job, *args):
+
+    def run():
+        close_old_connections()
+        try:
+            job(*args)
+        finally:
+            close_old_connections()
+
+    get_executor().submit(run)
+
+
+def _run_inline(job, *args):
+    job(*args)
+
+
+QUEUES = {
+    "thread": _run_in_thread,
+    "sync": _run_inline,
+}
+
+
+def get_queue():
+    queue = settings.TRACKERS_THUMBNAIL_QUEUE
+    return QUEUES[queue] if queue in QUEUES else import_string(queue)
+
+
+def schedule_renditions(obj):
+    """Render ``obj``'s image once the current transaction commits."""
+    label = obj._meta.label
+    transaction.on_commit(lambda: get_queue()(process, label, obj.pk))
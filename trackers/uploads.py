@@ -0,0 +1,120 @@
+"""
+Bounded handling of image uploads.
+
+``LimitedUploadHandler`` streams every uploaded file to a temporary file on
+disk and stops reading the request as soon as a file exceeds
+``TRACKERS_UPLOAD_MAX_FILE_SIZE`` or the request exceeds
+``TRACKERS_UPLOAD_MAX_REQUEST_SIZE``, so an oversized upload never has to be
+received in full. The reason is left on ``request.upload_error`` for the view
+to show with ``reject_failed_upload``.
+
+``process_image`` is used by the image form fields: it checks the header with
+Pillow (without decoding the pixels) and downscales originals larger than
+``TRACKERS_UPLOAD_MAX_DIMENSION``.
+"""
+
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import InMemoryUploadedFile
+from django.core.files.uploadhandler import StopUpload, TemporaryFileUploadHandler
+from django.template.defaultfilters import filesizeformat
+from PIL import Image, ImageOps
+
+ALLOWED_FORMATS = {"JPEG", "PNG", "GIF", "WEBP"}
+
+
+class LimitedUploadHandler(TemporaryFileUploadHandler):
+    def handle_raw_input(
+        self, input_data, META, content_length, boundary, encoding=None
+    ):
+        self.request_size = 0
+        self.request_too_large = (
+            content_length > settings.TRACKERS_UPLOAD_MAX_REQUEST_SIZE
+        )
+
+    def new_file(self, *args, **kwargs):
+        # Form fields before the first file (CSRF token, title...) are already
+        # parsed; stop before reading any file data.
+        if self.request_too_large:
+            self.reject_request()
+        super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        self.request_size += len(raw_data)
+        if start + len(raw_data) > settings.TRACKERS_UPLOAD_MAX_FILE_SIZE:
+            self.reject(
+                f"{self.file_name} is larger than "
+                f"{filesizeformat(settings.TRACKERS_UPLOAD_MAX_FILE_SIZE)}."
+            )
+        if self.request_size > settings.TRACKERS_UPLOAD_MAX_REQUEST_SIZE:
+            self.reject_request()
+        return super().receive_data_chunk(raw_data, start)
+
+    def reject_request(self):
+        self.reject(
+            "Uploads are limited to "
+            f"{filesizeformat(settings.TRACKERS_UPLOAD_MAX_REQUEST_SIZE)} in total."
+        )
+
+    def reject(self, message):
+        self.request.upload_error = message
+        raise StopUpload(connection_reset=True)
+
+
+def reject_failed_upload(request, form):
+    """Invalidate ``form`` if the upload handler stopped reading the request."""
+    error = getattr(request, "upload_error", None)
+    if error:
+        form.add_error(None, error)
+    return form
+
+
+def process_image(uploaded):
+    """
+    Validate an uploaded image from its header and return it, downscaled if
+    either side exceeds ``TRACKERS_UPLOAD_MAX_DIMENSION``.
+    """
+    if uploaded.size > settings.TRACKERS_UPLOAD_MAX_FILE_SIZE:
+        raise ValidationError(
+            "Images must be smaller than %(limit)s.",
+            params={"limit": filesizeformat(settings.TRACKERS_UPLOAD_MAX_FILE_SIZE)},
+        )
+
+    uploaded.seek(0)
+    try:
+        # Image.open only parses the header; pixels are decoded lazily.
+        image = Image.open(uploaded)
+    except (OSError, Image.DecompressionBombError):
+        raise ValidationError("Upload a valid image.")
+    if image.format not in ALLOWED_FORMATS:
+        raise ValidationError(
+            "Unsupported image format. Use JPEG, PNG, GIF or WebP.",
+        )
+
+    max_dimension = settings.TRACKERS_UPLOAD_MAX_DIMENSION
+    if max(image.size) <= max_dimension or getattr(image, "is_animated", False):
+        uploaded.seek(0)
+        return uploaded
+
+    image_format = image.format
+    # For JPEG this decodes at a reduced scale instead of full size
+    image.draft(image.mode, (max_dimension, max_dimension))
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+    if image_format == "JPEG" and image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+
+    buffer = BytesIO()
+    image.save(buffer, image_format, quality=88)
+    uploaded.close()
+    return InMemoryUploadedFile(
+        buffer,
+        field_name=getattr(uploaded, "field_name", None),
+        name=os.path.basename(uploaded.name),
+        content_type=Image.MIME[image_format],
+        size=buffer.tell(),
+        charset=None,
+    )
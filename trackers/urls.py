@@ -1,18 +1,34 @@
+from django.conf import settings
 from django.urls import path
 from .views import (
+    AsyncAllIssuesView,
+    AsyncTrackerDetailView,
     TrackerDetailView,
+    TrackerCommentsView,
     TrackerUpdateView,
     TrackerDeleteView,
+    TrackerReopenView,
     TrackerCreateView,
     AllIssuesView,
+    BulkTrackerActionView,
+    ExportTrackersView,
     add_comment,
+    tracker_events,
 )
 
+if settings.TRACKERS_ASYNC_VIEWS:
+    AllIssuesView, TrackerDetailView = AsyncAllIssuesView, AsyncTrackerDetailView
+
 urlpatterns = [
     path("<int:pk>/", TrackerDetailView.as_view(), name="tracker_detail"),
     path("<int:pk>/edit/", TrackerUpdateView.as_view(), name="tracker_edit"),
     path("<int:pk>/delete/", TrackerDeleteView.as_view(), name="tracker_delete"),
+    path("<int:pk>/reopen/", TrackerReopenView.as_view(), name="tracker_reopen"),
     path("new/", TrackerCreateView.as_view(), name="tracker_new"),
     path("all-issues/", AllIssuesView.as_view(), name="all_issues"),
+    path("<int:pk>/events/", tracker_events, name="tracker_events"),
+    path("export/", ExportTrackersView.as_view(), name="tracker_export"),
+    path("bulk/", BulkTrackerActionView.as_view(), name="tracker_bulk"),
     path("<int:pk>/add-comment/", add_comment, name="add_comment"),
+    path("<int:pk>/comments/", TrackerCommentsView.as_view(), name="tracker_comments"),
 ]
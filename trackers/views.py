@@ -1,6 +1,19 @@
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import (
+    HttpResponseBadRequest,
+    HttpResponseForbidden,
+    JsonResponse,
+    StreamingHttpResponse,
+)
+from django.template.loader import render_to_string
 from django.contrib import messages
 from django.views import View
-from django.shortcuts import render, redirect, get_object_or_404
+from django.shortcuts import render, redirect, get_object_or_404, aget_object_or_404
 from django.views.generic import (
     TemplateView,
     DetailView,
@@ -9,13 +22,48 @@ from django.views.generic import (
     UpdateView,
     DeleteView,
 )
-from django.views.generic.detail import SingleObjectMixin
-from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from django.views.generic.edit import FormMixin
+from django.contrib.auth.mixins import (
+    AccessMixin,
+    LoginRequiredMixin,
+    UserPassesTestMixin,
+)
 from django.urls import reverse_lazy, reverse
-from django.db.models import Q
-
-from .models import Tracker, TrackerImage
-from .forms import CommentForm, TrackerForm, TrackerImageFormSet
+from django.utils.http import urlencode
+from django.db import router, transaction
+from django.db.models import Prefetch
+
+from plain_tracker.replicas import ReplicaReadsMixin
+
+from .archive import restore_trackers
+from .models import ArchivedTracker, Comment, Tracker, TrackerImage
+from .bulk import apply_bulk_action
+from .conditional import (
+    add_validators,
+    detail_validators,
+    detail_version,
+    list_validators,
+    list_version,
+    not_modified,
+    search_version,
+)
+from .events import get_broker
+from .export import FORMATS, aiter_chunks, export_chunks, export_querysets, gzip_chunks
+from .forms import (
+    BulkTrackerActionForm,
+    CommentForm,
+    TrackerEditForm,
+    TrackerForm,
+    TrackerImageFormSet,
+)
+from .fragments import arender_tracker_cards, render_tracker_cards
+from .pagination import (
+    apaginate_keyset,
+    apaginate_keyset_merged,
+    paginate_keyset,
+    paginate_keyset_merged,
+)
+from .uploads import reject_failed_upload
 
 
 # ----------------------------
@@ -26,6 +74,7 @@ def add_comment(request, pk):
 
     if request.method == "POST":
         form = CommentForm(request.POST, request.FILES)  # accept files
+        reject_failed_upload(request, form)
         if form.is_valid():
             comment = form.save(commit=False)
             comment.tracker = tracker
@@ -44,24 +93,89 @@ def add_comment(request, pk):
     )
 
 
-class CommentGet(LoginRequiredMixin, DetailView):
-    model = Tracker
-    template_name = "trackers/tracker_detail.html"
+def comment_page(tracker, cursor=""):
+    """Newest comments of ``tracker`` with their authors, one page at a time."""
+    comments = tracker.comment_set.select_related("author")
+    return paginate_keyset(
+        comments, cursor, settings.TRACKERS_COMMENTS_PAGE_SIZE, field="created_at"
+    )
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        context["form"] = CommentForm()
-        return context
+
+async def acomment_page(tracker, cursor=""):
+    comments = tracker.comment_set.select_related("author")
+    return await apaginate_keyset(
+        comments, cursor, settings.TRACKERS_COMMENTS_PAGE_SIZE, field="created_at"
+    )
+
+
+class TrackerCommentsView(ReplicaReadsMixin, LoginRequiredMixin, View):
+    """Next page of comments on the detail page, loaded by HTMX."""
+
+    def get(self, request, pk):
+        tracker = Tracker.objects.only("pk").filter(pk=pk).first()
+        if tracker is None:
+            tracker = get_object_or_404(ArchivedTracker.objects.only("pk"), pk=pk)
+        page = comment_page(tracker, request.GET.get("cursor", ""))
+        return render(
+            request,
+            "trackers/partials/comment_list.html",
+            {"object": tracker, "comments": page},
+        )
+
+
+def tracker_detail_queryset(model=Tracker):
+    # The tracker, its users and comment count in one query, images in a
+    # second; comments are paged separately.
+    images, _ = model.objects.related_models()
+    return (
+        model.objects.select_related("author", "assigned_to")
+        .with_counts()
+        .prefetch_related(Prefetch("images", queryset=images.objects.order_by("pk")))
+    )
+
+
+def archived_tracker_context(tracker, comments):
+    # The tracker page without the comment form and live updates
+    return {"object": tracker, "tracker": tracker, "comments": comments}
 
 
-class CommentPost(SingleObjectMixin, FormView):
+class TrackerDetailView(ReplicaReadsMixin, LoginRequiredMixin, FormMixin, DetailView):
     model = Tracker
     form_class = CommentForm
     template_name = "trackers/tracker_detail.html"
 
+    def get_queryset(self):
+        return tracker_detail_queryset()
+
+    def get(self, request, *args, **kwargs):
+        version = detail_version(kwargs["pk"]).first()
+        if version is None:
+            tracker = get_object_or_404(
+                tracker_detail_queryset(ArchivedTracker), pk=kwargs["pk"]
+            )
+            context = archived_tracker_context(tracker, comment_page(tracker))
+            return render(request, self.template_name, context)
+
+        etag, last_modified = detail_validators(request, version)
+        response = not_modified(request, etag, last_modified)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+        return add_validators(response, etag, last_modified)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["comments"] = comment_page(self.object)
+        return context
+
     def post(self, request, *args, **kwargs):
         self.object = self.get_object()
-        return super().post(request, *args, **kwargs)
+        form = self.get_form()
+        if form.is_valid():
+            return self.form_valid(form)
+        return self.form_invalid(form)
+
+    def get_form(self, form_class=None):
+        return reject_failed_upload(self.request, super().get_form(form_class))
 
     def form_valid(self, form):
         comment = form.save(commit=False)
@@ -74,14 +188,129 @@ class CommentPost(SingleObjectMixin, FormView):
         return reverse("tracker_detail", kwargs={"pk": self.object.pk})
 
 
-class TrackerDetailView(LoginRequiredMixin, View):
-    def get(self, request, *args, **kwargs):
-        view = CommentGet.as_view()
-        return view(request, *args, **kwargs)
+# ----------------------------
+# Live updates
+# ----------------------------
+# Comments sent per query; a full batch means there may be more
+EVENT_BATCH_SIZE = 50
 
-    def post(self, request, *args, **kwargs):
-        view = CommentPost.as_view()
-        return view(request, *args, **kwargs)
+
+async def comments_since(tracker_pk, since, limit=EVENT_BATCH_SIZE):
+    comments = (
+        Comment.objects.filter(tracker_id=tracker_pk, pk__gt=since)
+        .select_related("author")
+        .order_by("pk")
+    )
+    return [comment async for comment in comments[:limit]]
+
+
+async def tracker_status(tracker_pk):
+    return await (
+        Tracker.objects.filter(pk=tracker_pk).values_list("status", flat=True).afirst()
+    )
+
+
+def comment_event(comment):
+    html = render_to_string("trackers/partials/comment_card.html", {"comment": comment})
+    return {"id": comment.pk, "html": html}
+
+
+def status_event(status):
+    return {"status": status, "label": dict(Tracker.STATUS_CHOICES).get(status)}
+
+
+def server_sent_event(event, data, event_id=None):
+    message = f"event: {event}\ndata: {json.dumps(data)}\n"
+    if event_id is not None:
+        message += f"id: {event_id}\n"
+    return message + "\n"
+
+
+async def stream_changes(tracker_pk, since, status, keep_open):
+    """
+    Server-sent events for new comments and status changes of a tracker.
+
+    Under ASGI the stream stays open and wakes up on broker notifications.
+    Under WSGI it sends what changed and closes; EventSource reconnects after
+    ``retry`` with the last event id, which turns it into polling.
+    """
+    async with get_broker().subscribe(tracker_pk) as notifications:
+        yield f"retry: {settings.TRACKERS_EVENTS_RETRY_MS}\n\n"
+        while True:
+            comments = await comments_since(tracker_pk, since)
+            for comment in comments:
+                since = comment.pk
+                yield server_sent_event("comment", comment_event(comment), since)
+
+            current = await tracker_status(tracker_pk)
+            if current != status:
+                status = current
+                yield server_sent_event("status", status_event(status), since)
+            if current is None or not keep_open:
+                return
+            if len(comments) == EVENT_BATCH_SIZE:
+                continue  # more to catch up on
+
+            try:
+                await asyncio.wait_for(
+                    notifications.get(), settings.TRACKERS_EVENTS_HEARTBEAT
+                )
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+
+
+async def poll_changes(tracker_pk, since, status):
+    """Long poll: wait until something changed (or the timeout) and return it."""
+    async with get_broker().subscribe(tracker_pk) as notifications:
+        comments = await comments_since(tracker_pk, since)
+        current = await tracker_status(tracker_pk)
+        if not comments and current == status:
+            try:
+                await asyncio.wait_for(
+                    notifications.get(), settings.TRACKERS_EVENTS_POLL_TIMEOUT
+                )
+            except asyncio.TimeoutError:
+                pass
+            comments = await comments_since(tracker_pk, since)
+            current = await tracker_status(tracker_pk)
+
+    return {
+        "cursor": comments[-1].pk if comments else since,
+        "status": status_event(current),
+        "comments": [comment_event(comment) for comment in comments],
+    }
+
+
+async def tracker_events(request, pk):
+    """
+    New comments and status changes of a tracker since ``since`` (a comment
+    id), as server-sent events, or as JSON with ``?poll=1``.
+    """
+    user = await request.auser()
+    if not user.is_authenticated:
+        return HttpResponseForbidden()
+    tracker = await aget_object_or_404(Tracker.objects.only("pk", "status"), pk=pk)
+
+    # EventSource reconnects with the original URL plus the last id it saw
+    since = request.headers.get("Last-Event-ID") or request.GET.get("since") or 0
+    try:
+        since = int(since)
+    except ValueError:
+        since = 0
+    status = request.GET.get("status", tracker.status)
+
+    if request.GET.get("poll"):
+        return JsonResponse(await poll_changes(tracker.pk, since, status))
+
+    response = StreamingHttpResponse(
+        stream_changes(
+            tracker.pk, since, status, keep_open=isinstance(request, ASGIRequest)
+        ),
+        content_type="text/event-stream",
+    )
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # don't let nginx buffer the stream
+    return response
 
 
 # ----------------------------
@@ -92,6 +321,9 @@ class TrackerCreateView(LoginRequiredMixin, CreateView):
     form_class = TrackerForm
     template_name = "trackers/tracker_new.html"
 
+    def get_form(self, form_class=None):
+        return reject_failed_upload(self.request, super().get_form(form_class))
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         if self.request.POST:
@@ -131,7 +363,7 @@ class TrackerCreateView(LoginRequiredMixin, CreateView):
 
 class TrackerUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
     model = Tracker
-    fields = ("body", "priority", "status", "assigned_to")
+    form_class = TrackerEditForm
     template_name = "trackers/tracker_edit.html"
 
     def test_func(self):
@@ -147,50 +379,244 @@ class TrackerDeleteView(LoginRequiredMixin, DeleteView):
         return self.get_object().author == self.request.user
 
 
+class TrackerReopenView(LoginRequiredMixin, View):
+    """Move an archived tracker back out of the archive, in progress again."""
+
+    def post(self, request, pk):
+        archived = get_object_or_404(ArchivedTracker.objects.only("author"), pk=pk)
+        if archived.author_id != request.user.pk:
+            return HttpResponseForbidden()
+
+        with transaction.atomic():
+            restored = restore_trackers(ArchivedTracker.objects.filter(pk=pk))
+            if not restored:
+                # Reopened concurrently
+                return redirect("tracker_detail", pk=pk)
+            tracker = restored[0]
+            tracker.status = "in_progress"
+            tracker.save()
+        messages.success(request, "Task reopened.")
+        return redirect(tracker.get_absolute_url())
+
+
+# ----------------------------
+# Bulk actions on selected trackers
+# ----------------------------
+class BulkTrackerActionView(LoginRequiredMixin, FormView):
+    form_class = BulkTrackerActionForm
+    http_method_names = ["post"]
+
+    def get_success_url(self):
+        filter_type = self.request.POST.get("filter", "all")
+        return f"{reverse('all_issues')}?{urlencode({'filter': filter_type})}"
+
+    def form_valid(self, form):
+        ids = form.cleaned_data["ids"]
+        changed = apply_bulk_action(
+            self.request.user, ids, form.cleaned_data["action"], form.value()
+        )
+        if changed:
+            messages.success(self.request, f"Updated {len(changed)} tracker(s).")
+        # Not theirs, archived or already gone
+        skipped = len(set(ids)) - len(changed)
+        if skipped:
+            messages.warning(
+                self.request, f"Skipped {skipped} tracker(s) you can't change."
+            )
+        return redirect(self.get_success_url())
+
+    def form_invalid(self, form):
+        for errors in form.errors.values():
+            for error in errors:
+                messages.error(self.request, error)
+        return redirect(self.get_success_url())
+
+
 # ----------------------------
 # Unified Issues View (All / My / Dropped)
 # ----------------------------
-class AllIssuesView(LoginRequiredMixin, TemplateView):
+def issue_list_filters(user, params):
+    """The trackers, and archived trackers, of the issue list tab asked for."""
+    filter_type = params.get("filter", "all")
+    models = [Tracker]
+    if filter_type in ("done", "dropped"):
+        # Trackers closed long ago are in the archive
+        models.append(ArchivedTracker)
+    return [model.objects.for_filter(user, filter_type) for model in models]
+
+
+def issue_list_query(user, params):
+    """The querysets and keyset arguments behind one page of the issue list."""
+    querysets = [qs.for_list() for qs in issue_list_filters(user, params)]
+    search_query = params.get("q", "")
+    if search_query:
+        # Best matches first, paged on the rank instead of the date
+        querysets = [qs.ranked_search(search_query) for qs in querysets]
+        return querysets, {"field": "search_rank", "parse": float}
+    return querysets, {}
+
+
+def issue_list_versions(user, params):
+    """The queries the issue list's ETag is made of (see trackers.conditional)."""
+    search_query = params.get("q", "")
+    if search_query:
+        return [
+            search_version(qs.search(search_query))
+            for qs in issue_list_filters(user, params)
+        ]
+    cursor = params.get("cursor", "")
+    return [
+        list_version(qs, cursor, settings.TRACKERS_PAGE_SIZE)
+        for qs in issue_list_filters(user, params)
+    ]
+
+
+def issue_list_context(request, page, cards):
+    context = {
+        "tracker_list": page.object_list,
+        "tracker_cards": cards,
+        "filter_type": request.GET.get("filter", "all"),
+        "search_query": request.GET.get("q", ""),  # keep search in the box
+        "cursor": request.GET.get("cursor", ""),
+    }
+    # Keep filter and search when asking for the next page
+    if page.has_next:
+        params = request.GET.copy()
+        params["cursor"] = page.next_cursor
+        context["next_page_query"] = params.urlencode()
+    return context
+
+
+def issue_list_template(request):
+    if request.headers.get("HX-Request"):
+        return "trackers/partials/task_list_partial.html"
+    return "trackers/all_issues.html"
+
+
+class AllIssuesView(ReplicaReadsMixin, LoginRequiredMixin, TemplateView):
     template_name = "trackers/all_issues.html"
 
+    def get(self, request, *args, **kwargs):
+        versions = issue_list_versions(request.user, request.GET)
+        rows = [row for version in versions for row in version]
+        etag, last_modified = list_validators(request, rows)
+        response = not_modified(request, etag, last_modified)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+        return add_validators(response, etag, last_modified)
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        filter_type = self.request.GET.get("filter", "all")
-        search_query = self.request.GET.get("q", "")
-
-        # Base queryset
-        if filter_type == "my":
-            qs = Tracker.objects.filter(
-                Q(author=self.request.user) | Q(assigned_to=self.request.user)
-            ).exclude(status__in=["drop", "done"])
-
-        elif filter_type == "dropped":
-            qs = Tracker.objects.filter(status="drop")
-            if not self.request.user.is_staff:
-                qs = qs.filter(
-                    Q(author=self.request.user) | Q(assigned_to=self.request.user)
-                )
+        querysets, keyset = issue_list_query(self.request.user, self.request.GET)
+        page = paginate_keyset_merged(
+            querysets,
+            self.request.GET.get("cursor", ""),
+            settings.TRACKERS_PAGE_SIZE,
+            **keyset,
+        )
+
+        context.update(
+            issue_list_context(
+                self.request, page, render_tracker_cards(page.object_list)
+            )
+        )
+        context["bulk_form"] = BulkTrackerActionForm()
+        self.template_name = issue_list_template(self.request)
+        return context
 
-        elif filter_type == "done":
-            qs = Tracker.objects.filter(status="done")
-            if not self.request.user.is_staff:
-                qs = qs.filter(
-                    Q(author=self.request.user) | Q(assigned_to=self.request.user)
-                )
 
-        else:
-            qs = Tracker.objects.exclude(status__in=["drop", "done"])
+class ExportTrackersView(ReplicaReadsMixin, LoginRequiredMixin, View):
+    """The issue list (same ``filter`` and ``q``) as a CSV or JSON Lines download."""
 
-        # Apply search filter (ID or Title)
-        if search_query:
-            qs = qs.filter(
-                Q(tracker_id__icontains=search_query) | Q(title__icontains=search_query)
-            )
+    def get(self, request):
+        export_format = request.GET.get("format", "csv")
+        if export_format not in FORMATS:
+            return HttpResponseBadRequest("Unknown export format.")
 
-        context["tracker_list"] = qs
-        context["search_query"] = search_query  # keep search in the box
+        # The response is streamed after the view returns, so pick the
+        # database now
+        using = router.db_for_read(Tracker)
+        querysets = export_querysets(request.user, request.GET)
+        chunks = export_chunks([qs.using(using) for qs in querysets], export_format)
+        filename, content_type = f"trackers.{export_format}", FORMATS[export_format]
+        if request.GET.get("gzip"):
+            chunks = gzip_chunks(chunks)
+            filename, content_type = f"{filename}.gz", "application/gzip"
+        if isinstance(request, ASGIRequest):
+            chunks = aiter_chunks(chunks)
 
-        if self.request.headers.get("HX-Request"):
-            self.template_name = "trackers/partials/task_list_partial.html"
+        response = StreamingHttpResponse(chunks, content_type=content_type)
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
 
-        return context
+
+# ----------------------------
+# Async variants (TRACKERS_ASYNC_VIEWS)
+# ----------------------------
+# Same pages as the sync views above, with every query run through the async
+# ORM so that under ASGI a request waiting on the database does not hold a
+# worker thread. Templates are rendered from fully loaded objects; anything
+# they would lazily query is loaded up front.
+class AsyncLoginRequiredMixin(AccessMixin):
+    async def dispatch(self, request, *args, **kwargs):
+        # Resolve the lazy user once, so templates and context processors
+        # don't query for it from the event loop.
+        request.user = await request.auser()
+        if not request.user.is_authenticated:
+            return self.handle_no_permission()
+        return await super().dispatch(request, *args, **kwargs)
+
+
+class AsyncAllIssuesView(ReplicaReadsMixin, AsyncLoginRequiredMixin, View):
+    async def get(self, request):
+        versions = issue_list_versions(request.user, request.GET)
+        rows = [row for version in versions async for row in version]
+        etag, last_modified = list_validators(request, rows)
+        # Reading pending messages may touch the session
+        response = await sync_to_async(not_modified)(request, etag, last_modified)
+        if response is not None:
+            return response
+
+        querysets, keyset = issue_list_query(request.user, request.GET)
+        page = await apaginate_keyset_merged(
+            querysets,
+            request.GET.get("cursor", ""),
+            settings.TRACKERS_PAGE_SIZE,
+            **keyset,
+        )
+        context = issue_list_context(
+            request, page, await arender_tracker_cards(page.object_list)
+        )
+        context["bulk_form"] = BulkTrackerActionForm()
+        response = render(request, issue_list_template(request), context)
+        return add_validators(response, etag, last_modified)
+
+
+class AsyncTrackerDetailView(ReplicaReadsMixin, AsyncLoginRequiredMixin, View):
+    async def get(self, request, pk):
+        version = await detail_version(pk).afirst()
+        if version is None:
+            tracker = await aget_object_or_404(
+                tracker_detail_queryset(ArchivedTracker), pk=pk
+            )
+            context = archived_tracker_context(tracker, await acomment_page(tracker))
+            return render(request, TrackerDetailView.template_name, context)
+
+        etag, last_modified = detail_validators(request, version)
+        response = await sync_to_async(not_modified)(request, etag, last_modified)
+        if response is not None:
+            return response
+
+        tracker = await aget_object_or_404(tracker_detail_queryset(), pk=pk)
+        context = {
+            "object": tracker,
+            "tracker": tracker,
+            "form": CommentForm(),
+            "comments": await acomment_page(tracker),
+        }
+        response = render(request, TrackerDetailView.template_name, context)
+        return add_validators(response, etag, last_modified)
+
+    async def post(self, request, pk):
+        # Posting a comment writes files and rows; leave that to the sync view
+        return await sync_to_async(TrackerDetailView.as_view())(request, pk=pk)